@@ -0,0 +1,281 @@
+"""
+Benchmarks for the hot paths in thehunt.py: building population columns, duels, combat and hunger trials, reproduction,
+reports and whole Epochs, at several population sizes and with fixed seeds.
+
+	python benchmark.py                                 #1k, 10k and 100k; writes benchmark.json
+	python benchmark.py --sizes 1000 --output new.json --compare benchmark.json
+
+Every benchmark is timed a few times and the best run is kept. Results are written as JSON, under the size each
+benchmark actually ran at: those that play duels through the python engine are capped by --max-duels, and a size that
+comes out the same as one already run is skipped. With --compare, any benchmark whose throughput fell by more than
+--threshold against the earlier file is flagged, and the exit status is 1.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import thehunt
+from thehunt import Organism, Population, Generation, Epoch, NullSink, BufferedRandom, run_duel, choose_mates
+
+
+RESULTS_VERSION = 1
+
+
+def best_time(run, setup=None, repeat=3):
+	#times run(state) repeat times, each on a fresh setup() if given, and returns the quickest in seconds
+	best = None
+	for i in range(0, repeat):
+		random.seed(i)
+		state = setup() if setup is not None else None
+		random.seed(i)
+		thehunt.dice.seed(i)
+		start = time.time()
+		run(state)
+		elapsed = time.time() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+
+def fought_generation(size, options):
+	"""
+	A generation of size organisms whose combat trials have been run, ready for hunger trials or reproduction. Without
+	numpy only the first --max-duels pairings are played out, since the python engine would take far longer over the 
+	setup than the benchmark takes; the rest are settled by a coin flip.
+	"""
+	gen = Generation(n=size)
+	pairing_dict = gen.generate_trial_pairings()
+	if options.setup_engine == 'numpy':
+		gen.run_vectorized_combat_trials(pairing_dict['pairings'], pairing_dict['leftovers'])
+	else:
+		pairings = pairing_dict['pairings']
+		flipped = [gen.settle_duel(predator_slot, prey_slot, random.random() < 0.5, gen.population.fortitude[predator_slot],
+			gen.population.fortitude[prey_slot]) for predator_slot, prey_slot in pairings[options.max_duels:]]
+		gen.run_combat_trials(pairings[:options.max_duels], pairing_dict['leftovers'] + flipped)
+	return gen, pairing_dict
+
+
+def bench_population_spawn(size, options):
+	#size generation 0 organisms added to a Population's columns, the way Generation(n=size) does it
+	def run(state):
+		population = Population()
+		rng = BufferedRandom(options.seed)
+		for i in range(0, size):
+			population.spawn(rng)
+	return best_time(run, repeat=options.repeat), size, size, 'organisms'
+
+
+def bench_population_breed(size, options):
+	#Population.breed_batch: offspring of a generation 0 of size organisms, rolled and derived column by column
+	def setup():
+		parents = Generation(n=size).population
+		a_slots, m_slots = choose_mates(parents)
+		return parents, a_slots, m_slots
+	born = []
+	def run(state):
+		parents, a_slots, m_slots = state
+		born.append(len(Population().breed_batch(parents, a_slots, m_slots)))
+	seconds = best_time(run, setup, options.repeat)
+	return seconds, size, max(born[-1], 1), 'organisms'
+
+
+def bench_duel(size, options):
+	#single duels, run_duel and take_combat_turn on plain Organisms; capped at --max-duels since they are slow
+	duels = min(size, options.max_duels)
+	def setup():
+		pairs = []
+		while len(pairs) < duels:
+			a, b = Organism(), Organism()
+			if a.viable and b.viable:
+				a.predator, b.predator = True, False
+				pairs.append((a, b))
+		return pairs
+	def run(pairs):
+		for a, b in pairs:
+			run_duel(a, b)
+	return best_time(run, setup, options.repeat), duels, duels, 'duels'
+
+
+def bench_combat_trials(size, options):
+	#run_combat_trials over every pairing of a generation; capped at twice --max-duels organisms, so that it never
+	#comes to more than --max-duels duels
+	size = min(size, 2 * options.max_duels)
+	duels = []
+	def setup():
+		gen = Generation(n=size)
+		pairing_dict = gen.generate_trial_pairings()
+		duels.append(len(pairing_dict['pairings']))
+		return gen, pairing_dict['pairings'], pairing_dict['leftovers']
+	def run(state):
+		gen, pairings, leftovers = state
+		gen.run_combat_trials(pairings, leftovers)
+	return best_time(run, setup, options.repeat), size, max(duels[-1], 1), 'duels'
+
+
+def bench_vectorized_combat_trials(size, options):
+	#every pairing of a generation of size organisms through the numpy engine
+	if thehunt.numpy is None:
+		return None
+	duels = []
+	def setup():
+		gen = Generation(n=size)
+		pairing_dict = gen.generate_trial_pairings()
+		duels.append(len(pairing_dict['pairings']))
+		return gen, pairing_dict['pairings'], pairing_dict['leftovers']
+	def run(state):
+		gen, pairings, leftovers = state
+		gen.run_vectorized_combat_trials(pairings, leftovers)
+	return best_time(run, setup, options.repeat), size, duels[-1], 'duels'
+
+
+def bench_hunger_trials(size, options):
+	counts = []
+	def setup():
+		gen, pairing_dict = fought_generation(size, options)
+		counts.append(len(pairing_dict['leftovers']))
+		return gen, pairing_dict
+	def run(state):
+		gen, pairing_dict = state
+		gen.run_hunger_trials(pairing_dict['leftovers'], pairing_dict['leftover_type'], sink=NullSink())
+	return best_time(run, setup, options.repeat), size, max(counts[-1], 1), 'organisms'
+
+
+def bench_reproduce(size, options):
+	born = []
+	def setup():
+		gen, pairing_dict = fought_generation(size, options)
+		gen.run_hunger_trials(pairing_dict['leftovers'], pairing_dict['leftover_type'], sink=NullSink())
+		return gen
+	def run(gen):
+		born.append(len(gen.reproduce().population))
+	seconds = best_time(run, setup, options.repeat)
+	return seconds, size, max(born[-1], 1), 'organisms'
+
+
+def bench_simulation_report(size, options):
+	def setup():
+		gen, pairing_dict = fought_generation(size, options)
+		gen.run_hunger_trials(pairing_dict['leftovers'], pairing_dict['leftover_type'], sink=NullSink())
+		gen.simulation_has_run = True
+		return gen
+	def run(gen):
+		gen.simulation_report(sink=NullSink())
+	return best_time(run, setup, options.repeat), size, size, 'organisms'
+
+
+def bench_epoch(size, options):
+	#a whole silent Epoch of --generations generations; with the python engine the size is capped at --max-duels
+	if options.setup_engine == 'python':
+		size = min(size, options.max_duels)
+	organisms = []
+	def run(state):
+		e = Epoch(size, options.generations, engine=options.setup_engine, seed=options.seed, sink=NullSink())
+		e.simulate()
+		organisms.append(sum(s['initial_total_count'] for s in e.summaries))
+	return best_time(run, repeat=options.repeat), size, organisms[-1], 'organisms'
+
+
+BENCHMARKS = [
+	('population_spawn', bench_population_spawn),
+	('population_breed', bench_population_breed),
+	('duel', bench_duel),
+	('combat_trials', bench_combat_trials),
+	('vectorized_combat_trials', bench_vectorized_combat_trials),
+	('hunger_trials', bench_hunger_trials),
+	('reproduce', bench_reproduce),
+	('simulation_report', bench_simulation_report),
+	('epoch', bench_epoch),
+]
+
+
+def run_benchmarks(options):
+	results = {}
+	for name, bench in BENCHMARKS:
+		if options.only and name not in options.only:
+			continue
+		results[name] = {}
+		for size in options.sizes:
+			random.seed(options.seed)
+			outcome = bench(size, options)
+			if outcome is None:
+				print("{:<26} {:>7}  skipped".format(name, size))
+				continue
+			#benchmarks report the size they actually ran at, which a cap can bring down to one already run
+			seconds, ran, units, unit = outcome
+			if str(ran) in results[name]:
+				print("{:<26} {:>7}  capped to {}, already run".format(name, size, ran))
+				continue
+			results[name][str(ran)] = {'seconds': seconds, 'units': units, 'unit': unit,
+				'throughput': units / seconds if seconds > 0 else None}
+			print("{:<26} {:>7}  {:>9.4f}s  {:>12.1f} {}/s".format(name, ran, seconds, results[name][str(ran)]['throughput'] or 0, unit))
+			sys.stdout.flush()
+	return results
+
+
+def compare(results, baseline, threshold):
+	"""
+	Returns the (name, size, old throughput, new throughput) of every benchmark in results that fell more than
+	threshold (a fraction) below baseline. Benchmarks missing from either side are ignored.
+	"""
+	regressions = []
+	for name in sorted(results):
+		for size in sorted(results[name], key=int):
+			old = baseline.get('results', {}).get(name, {}).get(size)
+			new = results[name][size]
+			if old is None or not old['throughput'] or not new['throughput']:
+				continue
+			if new['throughput'] < old['throughput'] * (1 - threshold):
+				regressions.append((name, size, old['throughput'], new['throughput']))
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmarks thehunt.py's hot paths.")
+	parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+	parser.add_argument('--only', nargs='+', choices=[name for name, bench in BENCHMARKS],
+		help="run just these benchmarks")
+	parser.add_argument('--repeat', type=int, default=3, help="timed runs per benchmark; the best is kept")
+	parser.add_argument('--max-duels', type=int, default=200,
+		help="cap on duels played through the python engine, timed or in setup; capped benchmarks are recorded under the size they ran at")
+	parser.add_argument('--generations', type=int, default=3, help="generations in the epoch benchmark")
+	parser.add_argument('--seed', type=int, default=1)
+	parser.add_argument('--output', default='benchmark.json')
+	parser.add_argument('--compare', help="earlier results file to check for regressions")
+	parser.add_argument('--threshold', type=float, default=0.10, help="throughput drop flagged as a regression")
+	options = parser.parse_args()
+	#combat has to run before hunger trials, reproduction and reports can be timed; numpy gets it done quickest
+	options.setup_engine = 'numpy' if thehunt.numpy is not None else 'python'
+
+	results = run_benchmarks(options)
+	with open(options.output, 'w') as f:
+		json.dump({
+			'version': RESULTS_VERSION,
+			'time': time.time(),
+			'python': platform.python_version(),
+			'implementation': platform.python_implementation(),
+			'platform': platform.platform(),
+			'setup_engine': options.setup_engine,
+			'seed': options.seed,
+			'results': results,
+		}, f, indent=1, sort_keys=True)
+	print("Results written to {}".format(options.output))
+
+	if options.compare:
+		with open(options.compare) as f:
+			baseline = json.load(f)
+		regressions = compare(results, baseline, options.threshold)
+		for name, size, old, new in regressions:
+			print("REGRESSION {} at {}: {:.1f}/s -> {:.1f}/s ({:+.1f}%)".format(name, size, old, new, (new / old - 1) * 100))
+		if regressions:
+			sys.exit(1)
+		print("No regressions against {}".format(options.compare))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,241 @@
+"""
+Checks that an alternative engine plays the same game as the reference one. Faster engines roll their dice
+differently, so their output can't be compared run for run; instead both are run many times on copies of the same
+populations and the distributions of what comes out are compared with two-sample tests.
+
+	python equivalence.py --candidate numpy
+	python equivalence.py --candidate parallel --trials 50 --size 600 --alpha 0.01
+	python equivalence.py --candidate table --table duels.json
+
+Combat engines (--reference and --candidate): python (run_combat_trials), slow (the same without fast-forwarding),
+numpy (run_vectorized_combat_trials), parallel (run_parallel_combat_trials on --workers processes) and table
+(run_combat_trials settling duels from the OutcomeTable in --table). Each trial pairs a copy of the trial's
+population the same way for both engines, plays the duels on different seeds, then runs hunger trials. Reproduction
+is checked too: breed_batch (batched) against the original one-at-a-time breeding, from the same ancestors.
+
+Compared:
+
+	predator_win_rate   share of all duels won by the predator (two-proportion z-test)
+	rounds              rounds each duel lasted: until the kill, or the 1000 round cutoff (Kolmogorov-Smirnov)
+	post_combat_*       per-trial survivor counts and imbalance (Kolmogorov-Smirnov)
+	offspring_*         each raw stat of every offspring (Kolmogorov-Smirnov)
+
+Only what the engines can disagree on is compared. Hunger deaths follow from the imbalance and the leftovers, which
+both engines share, and the number of offspring from the ancestors' virility, so neither is checked on its own. The
+table engine doesn't play the duels it settles, so it has rounds for only the rest, a sample skewed towards the
+matchups its table hasn't learned; rounds aren't compared when either engine is table. Its win rate and survivor
+counts still take in every duel.
+
+A comparison passes if its p-value is at least --alpha, or if the difference is within tolerance anyway (--rate-
+tolerance for the win rate, --ks-tolerance for the KS distance), since with enough samples even a negligible difference
+comes out significant. The exit status is 1 if anything failed.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import json
+import math
+import random
+import sys
+
+import thehunt
+from thehunt import Generation, Population, Metrics, OutcomeTable, NullSink
+
+
+def combat_engine(name, options):
+	#a function (generation, pairing_dict, seed, metrics) that runs the named engine's combat trials
+	if name == 'python':
+		return lambda gen, pairing_dict, seed, metrics: gen.run_combat_trials(pairing_dict['pairings'],
+			pairing_dict['leftovers'], seed=seed, metrics=metrics)
+	if name == 'slow':
+		return lambda gen, pairing_dict, seed, metrics: gen.run_combat_trials(pairing_dict['pairings'],
+			pairing_dict['leftovers'], seed=seed, fast_forward=False, metrics=metrics)
+	if name == 'numpy':
+		if thehunt.numpy is None:
+			raise SystemExit("The numpy engine needs numpy")
+		return lambda gen, pairing_dict, seed, metrics: gen.run_vectorized_combat_trials(pairing_dict['pairings'],
+			pairing_dict['leftovers'], seed=seed, metrics=metrics)
+	if name == 'parallel':
+		return lambda gen, pairing_dict, seed, metrics: gen.run_parallel_combat_trials(pairing_dict['pairings'],
+			pairing_dict['leftovers'], options.workers, seed, metrics=metrics)
+	if name == 'table':
+		if not options.table:
+			raise SystemExit("The table engine needs --table")
+		table = OutcomeTable.load(options.table)
+		return lambda gen, pairing_dict, seed, metrics: gen.run_combat_trials(pairing_dict['pairings'],
+			pairing_dict['leftovers'], seed=seed, metrics=metrics, outcome_table=table)
+	raise SystemExit("Unknown engine: {}".format(name))
+
+
+ENGINES = ('python', 'slow', 'numpy', 'parallel', 'table')
+
+
+def fresh_copy(population):
+	#a Generation over a copy of population, everyone alive again, ready for combat
+	return Generation(population=population.select(range(0, len(population))))
+
+
+def play(population, engine, trial, seed):
+	"""
+	One trial of an engine on a copy of population: pairings drawn from the trial number (so both engines get the same
+	ones), duels on seed, then hunger trials. Returns the per-duel outcomes, the duels' Metrics and the generation.
+	"""
+	gen = fresh_copy(population)
+	random.seed(trial)
+	pairing_dict = gen.generate_trial_pairings()
+	metrics = Metrics()
+	engine(gen, pairing_dict, seed, metrics)
+	predator_won = [gen.population.alive[predator_slot] for predator_slot, prey_slot in pairing_dict['pairings']]
+	gen.run_hunger_trials(pairing_dict['leftovers'], pairing_dict['leftover_type'], sink=NullSink())
+	return predator_won, metrics, gen
+
+
+def expand(distribution):
+	#a Metrics distribution, {value: number of duels}, as a sorted list of values
+	values = []
+	for value in sorted(distribution):
+		values.extend([value] * distribution[value])
+	return values
+
+
+def ks_test(a, b):
+	"""
+	Two-sample Kolmogorov-Smirnov test: returns (D, p-value), D being the largest gap between the two empirical
+	distribution functions and the p-value from the asymptotic Kolmogorov distribution (conservative with ties).
+	"""
+	a, b = sorted(a), sorted(b)
+	n, m = len(a), len(b)
+	if not n or not m:
+		return 0.0, 1.0
+	i = j = 0
+	d = 0.0
+	while i < n and j < m:
+		value = min(a[i], b[j])
+		while i < n and a[i] == value:
+			i += 1
+		while j < m and b[j] == value:
+			j += 1
+		d = max(d, abs(i / n - j / m))
+	effective = math.sqrt(n * m / (n + m))
+	lam = (effective + 0.12 + 0.11 / effective) * d
+	if lam < 1e-3:
+		return d, 1.0
+	p = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+	return d, min(max(p, 0.0), 1.0)
+
+
+def proportion_test(successes_a, n_a, successes_b, n_b):
+	#two-proportion z-test: returns (difference in proportions, two-sided p-value)
+	if not n_a or not n_b:
+		return 0.0, 1.0
+	rate_a, rate_b = successes_a / n_a, successes_b / n_b
+	pooled = (successes_a + successes_b) / (n_a + n_b)
+	spread = math.sqrt(pooled * (1 - pooled) * (1 / n_a + 1 / n_b))
+	if spread == 0:
+		return rate_a - rate_b, 1.0 if rate_a == rate_b else 0.0
+	return rate_a - rate_b, math.erfc(abs(rate_a - rate_b) / spread / math.sqrt(2))
+
+
+def compare(name, test, reference, candidate, options):
+	#runs one comparison and returns its result record; 'reference' and 'candidate' are the rates or means, for the report
+	if test == 'proportion':
+		difference, p = proportion_test(sum(reference), len(reference), sum(candidate), len(candidate))
+		tolerance = options.rate_tolerance
+	else:
+		difference, p = ks_test(reference, candidate)
+		tolerance = options.ks_tolerance
+	return {
+		'name': name,
+		'test': test,
+		'reference': sum(reference) / max(len(reference), 1),
+		'candidate': sum(candidate) / max(len(candidate), 1),
+		'difference': difference,
+		'p': p,
+		'tolerance': tolerance,
+		'samples': [len(reference), len(candidate)],
+		'passed': p >= options.alpha or abs(difference) <= tolerance,
+	}
+
+
+def check_combat(options):
+	reference_engine = combat_engine(options.reference, options)
+	candidate_engine = combat_engine(options.candidate, options)
+	counters = ('post_combat_predator_count', 'post_combat_prey_count', 'post_combat_population_imbalance')
+	samples = dict((side, {'predator_win_rate': [], 'rounds': [], 'counters': dict((c, []) for c in counters)})
+		for side in ('reference', 'candidate'))
+
+	for trial in range(0, options.trials):
+		random.seed(options.seed * 100003 + trial)
+		population = Generation(n=options.size).population
+		for side, engine, seed in (('reference', reference_engine, 2 * trial), ('candidate', candidate_engine, 2 * trial + 1)):
+			predator_won, metrics, gen = play(population, engine, trial, options.seed * 100003 + seed)
+			samples[side]['predator_win_rate'].extend(predator_won)
+			samples[side]['rounds'].extend(expand(metrics.distributions['rounds']))
+			for counter in counters:
+				samples[side]['counters'][counter].append(getattr(gen, counter))
+
+	results = [compare('predator_win_rate', 'proportion', samples['reference']['predator_win_rate'],
+		samples['candidate']['predator_win_rate'], options)]
+	if 'table' not in (options.reference, options.candidate):
+		results.append(compare('rounds', 'ks', samples['reference']['rounds'], samples['candidate']['rounds'], options))
+	for counter in counters:
+		results.append(compare(counter, 'ks', samples['reference']['counters'][counter],
+			samples['candidate']['counters'][counter], options))
+	return results
+
+
+def check_reproduction(options):
+	#breed_batch (batched) against the original breeding, on the survivors of the same generations
+	samples = dict((side, dict((name, []) for name in Population.raw_columns)) for side in ('reference', 'candidate'))
+	for trial in range(0, options.trials):
+		random.seed(options.seed * 100003 + trial)
+		gen = Generation(n=options.size)
+		ancestors = gen.population.select(list(gen.predator_slots) + list(gen.prey_slots))
+		for side, batched, seed in (('reference', False, 2 * trial), ('candidate', True, 2 * trial + 1)):
+			random.seed(options.seed * 100003 + seed)
+			offspring = Generation(ancestors=ancestors, batched=batched).population
+			for name in Population.raw_columns:
+				samples[side][name].extend(getattr(offspring, name))
+
+	return [compare('offspring_' + name, 'ks', samples['reference'][name], samples['candidate'][name], options)
+		for name in Population.raw_columns]
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Tests an alternative engine against the reference for equivalent outcomes.")
+	parser.add_argument('--reference', choices=ENGINES, default='python')
+	parser.add_argument('--candidate', choices=ENGINES, default='numpy')
+	parser.add_argument('--trials', type=int, default=20, help="populations to run both engines on")
+	parser.add_argument('--size', type=int, default=400, help="organisms per population")
+	parser.add_argument('--seed', type=int, default=1)
+	parser.add_argument('--workers', type=int, default=2, help="processes for the parallel engine")
+	parser.add_argument('--table', help="OutcomeTable file for the table engine")
+	parser.add_argument('--alpha', type=float, default=0.01, help="significance level")
+	parser.add_argument('--rate-tolerance', type=float, default=0.02, help="win rate difference accepted regardless")
+	parser.add_argument('--ks-tolerance', type=float, default=0.05, help="KS distance accepted regardless")
+	parser.add_argument('--skip-reproduction', action='store_true')
+	parser.add_argument('--output', help="also write the results here as JSON")
+	options = parser.parse_args()
+
+	results = check_combat(options)
+	if not options.skip_reproduction:
+		results += check_reproduction(options)
+
+	for result in results:
+		print("{:<36} {:<10} ref {:>10.4f}  cand {:>10.4f}  diff {:>+8.4f}  p {:.4f}  {}".format(result['name'], result['test'],
+			result['reference'], result['candidate'], result['difference'], result['p'], 'pass' if result['passed'] else 'FAIL'))
+	if options.output:
+		with open(options.output, 'w') as f:
+			json.dump({'reference': options.reference, 'candidate': options.candidate, 'trials': options.trials,
+				'size': options.size, 'seed': options.seed, 'alpha': options.alpha, 'results': results}, f, indent=1, sort_keys=True)
+
+	failed = [result['name'] for result in results if not result['passed']]
+	if failed:
+		print("{} of {} comparisons FAILED: {}".format(len(failed), len(results), ', '.join(failed)))
+		sys.exit(1)
+	print("All {} comparisons passed".format(len(results)))
+
+
+if __name__ == "__main__":
+	main()
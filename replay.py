@@ -0,0 +1,76 @@
+"""
+Plays back duels recorded by a DuelRecorder, turn by turn.
+
+	python replay.py duels.bin --list                #every recorded duel, one line each
+	python replay.py duels.bin --duel 3              #duel 3, every event
+	python replay.py duels.bin --duel 3 --rounds 40  #just its first 40 rounds
+
+A duel is rebuilt from its events alone: the placement gives both starting positions and fortitudes, and each turn
+after that moves one player and sets both fortitudes, so the state printed on every line is the duel as it stood after
+that turn. Fast-forwarded stretches show up as a single skip line with both positions after the skip.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import sys
+
+from thehunt import DuelRecorder
+
+
+def describe(details):
+	#one line about a recorded duel
+	return "duel {:>5}  generation {:>3}  pairing {:>5}  {:>4} rounds  {} won".format(details['duel'], details['generation'],
+		details['pairing'], details['rounds'], 'predator' if details['predator_won'] else 'prey')
+
+
+def replay(details, events, rounds=None):
+	print(describe(details))
+	for side in ('predator', 'prey'):
+		print("  {:<8} {}".format(side, ' '.join(str(value) for value in details[side])))
+	#positions and fortitudes, predator first, as they stand after each event
+	positions = [None, None]
+	fortitudes = [None, None]
+	for duel, round_number, kind, actor, x, y, other_x, other_y, fortitude, other_fortitude, damage, other_damage in events:
+		if rounds is not None and round_number > rounds:
+			print("  ...")
+			break
+		me, other = (0, 1) if actor else (1, 0)
+		positions[me], positions[other] = (x, y), (other_x, other_y)
+		fortitudes[me], fortitudes[other] = fortitude, other_fortitude
+		name = DuelRecorder.kind_names[kind]
+		#the note says whose turn it was, and what damage was done
+		if kind == DuelRecorder.SKIP:
+			note = "{} rounds skipped".format(damage)
+		elif kind in (DuelRecorder.PLACE, DuelRecorder.STARVE):
+			note = ''
+		else:
+			note = 'predator' if actor else 'prey'
+			if damage or other_damage:
+				note += ", took {} and dealt {}".format(damage, other_damage)
+		print("  {:>4}  {:<6}  predator {:>9} fort {:>3}   prey {:>9} fort {:>3}   {}".format(round_number, name,
+			"{},{}".format(*positions[0]), fortitudes[0], "{},{}".format(*positions[1]), fortitudes[1], note))
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Plays back duels recorded by a DuelRecorder.")
+	parser.add_argument('path', help="the recorder's path")
+	parser.add_argument('--list', action='store_true', help="list the recorded duels")
+	parser.add_argument('--duel', type=int, help="duel to play back")
+	parser.add_argument('--rounds', type=int, help="stop after this many rounds")
+	options = parser.parse_args()
+
+	details, events = DuelRecorder.read(options.path)
+	if options.duel is None or options.list:
+		for duel in details:
+			print(describe(duel))
+		if options.duel is None:
+			return
+	found = [duel for duel in details if duel['duel'] == options.duel]
+	if not found or options.duel not in events:
+		sys.exit("Duel {} was not recorded in {}".format(options.duel, options.path))
+	replay(found[0], events[options.duel], options.rounds)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,154 @@
+"""
+Runs many Epochs over a grid of configurations on a local process pool, instead of one interactive run at a time.
+
+	python sweep.py --sizes 500 1000 2000 --iterations 50 --seeds 1 2 3 --processes 4 --output sweep.jsonl
+	python sweep.py --grid grid.json --output sweep.jsonl --resume
+
+A grid is every combination of the values given for each Epoch setting; in a grid file it is a JSON object of lists,
+e.g. {"initial_size": [500, 1000], "target_iterations": [50], "seed": [1, 2, 3], "engine": ["numpy"]}. Runs are
+handed to the pool one at a time, so a worker whose run collapses early just picks up the next one. Each finished run is
+written to the output file as one JSON line holding its configuration and every generation summary, as soon as it is
+done; with --resume, configurations already in the file are skipped.
+
+With --cache, every worker looks generations up in a GenerationCache in that directory before simulating them, so runs
+that share a seed and initial size only simulate their common early generations once.
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+
+from thehunt import Organism, Generation, Epoch, NullSink, GenerationCache
+
+
+#Epoch settings a grid may vary, and what they are if it doesn't
+GRID_DEFAULTS = [
+	('initial_size', [1000]),
+	('target_iterations', [10]),
+	('seed', [None]),
+	('engine', ['python']),
+]
+
+#the worker's GenerationCache, if the sweep has one; see use_cache
+cache = None
+
+
+def expand_grid(grid):
+	#every combination of the grid's values, as a list of config dicts in a stable order
+	keys = [key for key, default in GRID_DEFAULTS] + sorted(key for key in grid if key not in dict(GRID_DEFAULTS))
+	values = [grid.get(key, dict(GRID_DEFAULTS).get(key)) for key in keys]
+	return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+def config_key(config):
+	#identifies a configuration in the results file
+	return json.dumps(config, sort_keys=True)
+
+
+def use_cache(directory, max_bytes):
+	#pool initializer: gives the worker its own GenerationCache over the shared directory
+	global cache
+	if directory is not None:
+		cache = GenerationCache(directory, max_bytes)
+
+
+def run_config(config):
+	"""
+	Pool entry point: runs one silent Epoch for config and returns its result record. The class counters are reset
+	first so that a run's organism and generation ids don't depend on what else its worker has run.
+	"""
+	Organism.organism_counter = 0
+	Organism.predator_counter = 0
+	Organism.prey_counter = 0
+	Generation.generation_counter = 0
+
+	settings = dict(config)
+	initial_size = settings.pop('initial_size')
+	target_iterations = settings.pop('target_iterations')
+	started = time.time()
+	e = Epoch(initial_size, target_iterations, sink=NullSink(), cache=cache, **settings)
+	e.simulate()
+	return {
+		'config': config,
+		'collapsed': e.population_collapse,
+		'generations': len(e.summaries),
+		'seconds': time.time() - started,
+		'summaries': e.summaries,
+	}
+
+
+def run_sweep(configs, output, processes=None, cache_dir=None, cache_bytes=None):
+	"""
+	Runs every config on a pool of processes (one per CPU by default) and appends each result to the file output as
+	soon as it comes back, in whatever order the runs finish. Returns the number of runs completed.
+	"""
+	completed = 0
+	pool = multiprocessing.Pool(processes, use_cache, (cache_dir, cache_bytes))
+	try:
+		with open(output, 'a') as f:
+			for result in pool.imap_unordered(run_config, configs, 1):
+				f.write(json.dumps(result) + '\n')
+				f.flush()
+				completed += 1
+				print("[{}/{}] {} -> {} generations{} in {:.1f}s".format(completed, len(configs), config_key(result['config']),
+					result['generations'], ' (collapsed)' if result['collapsed'] else '', result['seconds']))
+				sys.stdout.flush()
+		pool.close()
+	finally:
+		pool.terminate()
+		pool.join()
+	return completed
+
+
+def finished_configs(output):
+	#keys of the configs that already have a result in output
+	done = set()
+	try:
+		with open(output) as f:
+			for line in f:
+				if line.strip():
+					done.add(config_key(json.loads(line)['config']))
+	except IOError:
+		pass
+	return done
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Runs a grid of Epoch configurations on a process pool.")
+	parser.add_argument('--grid', help="JSON file mapping Epoch settings to lists of values")
+	parser.add_argument('--sizes', type=int, nargs='+', help="initial_size values")
+	parser.add_argument('--iterations', type=int, nargs='+', help="target_iterations values")
+	parser.add_argument('--seeds', type=int, nargs='+', help="seed values")
+	parser.add_argument('--engines', nargs='+', choices=['python', 'numpy', 'world'], help="engine values")
+	parser.add_argument('--processes', type=int, help="pool size; one per CPU by default")
+	parser.add_argument('--output', default='sweep.jsonl')
+	parser.add_argument('--resume', action='store_true', help="skip configurations already in the output file")
+	parser.add_argument('--cache', help="directory to cache simulated generations in")
+	parser.add_argument('--cache-size', type=int, default=256, help="megabytes the cache may take up")
+	options = parser.parse_args()
+
+	grid = {}
+	if options.grid:
+		with open(options.grid) as f:
+			grid = json.load(f)
+	for key, values in (('initial_size', options.sizes), ('target_iterations', options.iterations),
+			('seed', options.seeds), ('engine', options.engines)):
+		if values:
+			grid[key] = values
+
+	configs = expand_grid(grid)
+	if options.resume:
+		done = finished_configs(options.output)
+		configs = [config for config in configs if config_key(config) not in done]
+	print("{} runs to go".format(len(configs)))
+	run_sweep(configs, options.output, options.processes, options.cache, options.cache_size * 2**20)
+	print("Results in {}".format(options.output))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,62 @@
+"""
+Checks that a run whose generations all come out of a GenerationCache ends exactly where the same run simulated without
+a cache does.
+
+	python -m unittest test_cache
+"""
+
+from __future__ import division, print_function
+
+import shutil
+import tempfile
+import unittest
+
+from thehunt import Organism, Generation, Epoch, GenerationCache, NullSink
+
+
+def counters():
+	return (Organism.organism_counter, Organism.predator_counter, Organism.prey_counter, Generation.generation_counter)
+
+
+def set_counters(state):
+	Organism.organism_counter, Organism.predator_counter, Organism.prey_counter, Generation.generation_counter = state
+
+
+def outcome(epoch):
+	#the summaries, and the final generation as it was left
+	gen = epoch.generations[-1]
+	return (epoch.summaries, [list(getattr(gen.population, name)) for name in ('id', 'fortitude', 'alive')],
+		list(gen.predator_slots), list(gen.prey_slots))
+
+
+class GenerationCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.counters = counters()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def run_epoch(self, **kwargs):
+		set_counters(self.counters)
+		return Epoch(150, 3, seed=3, sink=NullSink(), **kwargs).simulate()
+
+	def test_cache_hit_equals_uncached_run(self):
+		expected = outcome(self.run_epoch())
+		cache = GenerationCache(self.directory)
+		self.assertEqual(outcome(self.run_epoch(cache=cache)), expected)
+		self.assertEqual(cache.hits, 0)
+		simulated = cache.misses
+		self.assertEqual(outcome(self.run_epoch(cache=cache)), expected)
+		self.assertEqual(cache.hits, simulated)
+		self.assertEqual(cache.misses, simulated)
+
+	def test_eviction(self):
+		cache = GenerationCache(self.directory, max_bytes=0)
+		self.run_epoch(cache=cache)
+		self.assertEqual(cache.entries(), [])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,67 @@
+"""
+Checks that a run stopped after a checkpoint and resumed from it ends exactly where the same run played through without
+stopping does.
+
+	python -m unittest test_checkpoint
+"""
+
+from __future__ import division, print_function
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from thehunt import Organism, Generation, Epoch, NullSink
+
+
+def counters():
+	return (Organism.organism_counter, Organism.predator_counter, Organism.prey_counter, Generation.generation_counter)
+
+
+def set_counters(state):
+	Organism.organism_counter, Organism.predator_counter, Organism.prey_counter, Generation.generation_counter = state
+
+
+def plain(summaries):
+	#summaries as they come back out of a checkpoint's JSON header
+	return json.loads(json.dumps(summaries))
+
+
+class CheckpointTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.path = os.path.join(self.directory, 'run.ckpt')
+		self.counters = counters()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def resumed(self, stop_after):
+		#runs stop_after generations, checkpointing after each, then finishes the run from the checkpoint
+		set_counters(self.counters)
+		epoch = Epoch(200, 4, seed=3, sink=NullSink(), checkpoint_path=self.path)
+		for i, summary in zip(range(stop_after), epoch.iter_generations()):
+			pass
+		return Epoch.load_checkpoint(self.path, sink=NullSink()).simulate()
+
+	def uninterrupted(self):
+		set_counters(self.counters)
+		return Epoch(200, 4, seed=3, sink=NullSink()).simulate()
+
+	def test_resumed_run_equals_uninterrupted_run(self):
+		expected = plain(self.uninterrupted().summaries)
+		for stop_after in (1, 3):
+			self.assertEqual(plain(self.resumed(stop_after).summaries), expected)
+
+	def test_counters_carry_on(self):
+		self.uninterrupted()
+		expected = counters()
+		self.resumed(2)
+		self.assertEqual(counters(), expected)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,86 @@
+"""
+Checks that fast-forwarding through out-of-range rounds doesn't change what duels come to: wander_offset has to draw
+the net displacement of many wandering steps from exactly the distribution that taking them one by one gives, and
+duels fast-forwarded or stepped through tick by tick have to end the same way as often.
+
+	python -m unittest test_fast_forward
+"""
+
+from __future__ import division, print_function
+
+import random
+import unittest
+
+from thehunt import Organism, Generation, BufferedRandom, run_duel, wander_offset
+
+
+def exact_wander(steps):
+	#the distribution of the net displacement of steps wandering steps, by convolution: offset -> probability
+	distribution = {0: 1.0}
+	for i in range(steps):
+		following = {}
+		for offset, p in distribution.items():
+			for move in (-1, 0, 1):
+				following[offset + move] = following.get(offset + move, 0.0) + p / 3
+		distribution = following
+	return distribution
+
+
+def distance(samples, distribution):
+	#total variation distance between a sample and a distribution
+	counts = {}
+	for offset in samples:
+		counts[offset] = counts.get(offset, 0) + 1
+	offsets = set(counts) | set(distribution)
+	return sum(abs(counts.get(offset, 0) / len(samples) - distribution.get(offset, 0.0)) for offset in offsets) / 2
+
+
+class WanderOffsetTest(unittest.TestCase):
+
+	steps = 30
+	samples = 10000
+
+	def test_wander_offset_matches_the_steps(self):
+		distribution = exact_wander(self.steps)
+		rng = BufferedRandom(1)
+		fast = [wander_offset(self.steps, rng) for i in range(self.samples)]
+
+		rng = BufferedRandom(2)
+		walker = Organism(rng=rng)
+		stepped = []
+		for i in range(self.samples):
+			location = (0, 0)
+			for j in range(self.steps):
+				location = walker.step(location, rng=rng)
+			stepped.append(location[0])
+
+		self.assertLess(distance(stepped, distribution), 0.03)
+		self.assertLess(distance(fast, distribution), 0.03)
+
+	def test_no_steps(self):
+		self.assertEqual(wander_offset(0, BufferedRandom(3)), 0)
+
+
+class FastForwardDuelTest(unittest.TestCase):
+
+	duels = 300
+
+	def predator_wins(self, fast_forward, seed):
+		#how often the predators of a generation win their pairings
+		random.seed(4)
+		gen = Generation(n=2 * self.duels)
+		pairings = gen.generate_trial_pairings()['pairings']
+		rng = BufferedRandom(seed)
+		wins = 0
+		for predator_slot, prey_slot in pairings:
+			predator = Organism.from_combat_record(gen.population.combat_record(predator_slot))
+			prey = Organism.from_combat_record(gen.population.combat_record(prey_slot))
+			wins += run_duel(predator, prey, rng, fast_forward) is predator
+		return wins / len(pairings)
+
+	def test_fast_forward_matches_tick_by_tick(self):
+		self.assertAlmostEqual(self.predator_wins(True, 5), self.predator_wins(False, 6), delta=0.1)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,98 @@
+"""
+Checks LineageStore's queries against a brute-force walk over every record of a short run.
+
+	python -m unittest test_lineage
+"""
+
+from __future__ import division, print_function
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from thehunt import Epoch, LineageStore, NullSink
+
+
+def read_parents(path):
+	#id -> (parent a id, parent b id) for every record in the store, in file order
+	parents = {}
+	order = []
+	with open(path, 'rb') as f:
+		data = f.read()
+	for start in range(0, len(data), LineageStore.record_size):
+		fields = LineageStore.record_struct.unpack_from(data, start)
+		parents[fields[0]] = tuple(parent for parent in fields[1:3] if parent != LineageStore.no_parent)
+		order.append(fields[0])
+	return parents, order
+
+
+def walk_ancestors(parents, organism_id, generations=None):
+	#every ancestor and the fewest generations back it turns up, by trying every line
+	found = {}
+	def walk(child, depth):
+		if generations is not None and depth > generations:
+			return
+		for parent in parents.get(child, ()):
+			if parent not in found or depth < found[parent]:
+				found[parent] = depth
+			walk(parent, depth + 1)
+	walk(organism_id, 1)
+	return found
+
+
+class LineageStoreTest(unittest.TestCase):
+
+	@classmethod
+	def setUpClass(cls):
+		cls.directory = tempfile.mkdtemp()
+		cls.path = os.path.join(cls.directory, 'lineage.bin')
+		epoch = Epoch(150, 3, seed=3, lineage_path=cls.path, sink=NullSink()).simulate()
+		cls.store = epoch.lineage
+		cls.parents, cls.order = read_parents(cls.path)
+
+	@classmethod
+	def tearDownClass(cls):
+		cls.store.close()
+		shutil.rmtree(cls.directory)
+
+	def sample(self):
+		#a spread of ids from every generation
+		return self.order[::max(1, len(self.order) // 40)] + [self.order[-1]]
+
+	def test_every_organism_is_recorded(self):
+		self.assertEqual(len(self.store), len(self.order))
+		self.assertEqual(self.order, sorted(self.order))
+		for organism_id in self.sample():
+			self.assertEqual(self.store.get(organism_id)['id'], organism_id)
+		self.assertIsNone(self.store.get(self.order[-1] + 1))
+
+	def test_ancestors(self):
+		for organism_id in self.sample():
+			self.assertEqual(self.store.ancestors(organism_id), walk_ancestors(self.parents, organism_id))
+			self.assertEqual(self.store.ancestors(organism_id, 1), walk_ancestors(self.parents, organism_id, 1))
+
+	def test_existing_store_refused(self):
+		#a new run won't write over another run's store unless told to
+		with open(self.path, 'rb') as f:
+			before = f.read()
+		self.assertRaises(ValueError, Epoch, 150, 1, lineage_path=self.path, sink=NullSink())
+		with open(self.path, 'rb') as f:
+			self.assertEqual(f.read(), before)
+
+	def test_overwrite(self):
+		path = os.path.join(self.directory, 'overwritten.bin')
+		shutil.copy(self.path, path)
+		epoch = Epoch(50, 1, seed=3, lineage_path=path, lineage_overwrite=True, sink=NullSink()).simulate()
+		epoch.lineage.close()
+		parents, order = read_parents(path)
+		self.assertEqual(len(order), 50)
+
+	def test_descendants(self):
+		for organism_id in self.sample():
+			expected = [other for other in self.order if organism_id in walk_ancestors(self.parents, other)]
+			self.assertEqual(self.store.descendants(organism_id), expected)
+
+
+if __name__ == '__main__':
+	unittest.main()
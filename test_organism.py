@@ -0,0 +1,58 @@
+"""
+Checks that the per-organism API keeps working on its own: plain Organisms and Generation views can sense each other
+and fight duels without anything being prepared for them first.
+
+	python -m unittest test_organism
+"""
+
+from __future__ import division, print_function
+
+import random
+import unittest
+
+from thehunt import Organism, Generation, BufferedRandom, run_duel
+
+
+def viable_pair():
+	#a viable predator and a viable prey, as plain Organisms
+	while True:
+		a, b = Organism(), Organism()
+		if a.viable and b.viable:
+			a.predator, b.predator = True, False
+			return a, b
+
+
+class PlainOrganismTest(unittest.TestCase):
+
+	def setUp(self):
+		random.seed(1)
+
+	def test_sense_other_without_preparation(self):
+		a, b = viable_pair()
+		self.assertIn(a.sense_other(b, (0, 0), (1, 1), BufferedRandom(1)), (True, False))
+		self.assertEqual(a.perception_sq, a.perception * a.perception)
+
+	def test_take_combat_turn_without_preparation(self):
+		a, b = viable_pair()
+		outcome = a.take_combat_turn(b, (0, 0), (0, 0), BufferedRandom(2))
+		self.assertTrue(isinstance(outcome, tuple) or outcome in (a, b))
+
+	def test_duel_between_plain_organisms(self):
+		for seed in range(0, 5):
+			a, b = viable_pair()
+			victor = run_duel(a, b, BufferedRandom(seed))
+			self.assertIn(victor, (a, b))
+			self.assertEqual(a.alive + b.alive, 1)
+
+	def test_duel_between_views(self):
+		gen = Generation(n=200)
+		predator, prey = gen.predators[0], gen.prey[0]
+		self.assertIn(predator.sense_other(prey, (0, 0), (1, 1), BufferedRandom(3)), (True, False))
+		self.assertIn(run_duel(predator, prey, BufferedRandom(3)), (predator, prey))
+
+	def test_missing_attributes_still_raise(self):
+		self.assertRaises(AttributeError, getattr, Organism(), 'no_such_stat')
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,52 @@
+"""
+Checks that run_parallel_combat_trials settles every duel the way run_combat_trials does with the same seed.
+
+	python -m unittest test_parallel
+"""
+
+from __future__ import division, print_function
+
+import random
+import unittest
+
+from thehunt import Organism, Generation, Epoch, NullSink
+
+
+def paired_generation(size):
+	#the same generation 0 and the same pairings every time
+	random.seed(5)
+	gen = Generation(n=size)
+	random.seed(6)
+	trials = gen.generate_trial_pairings()
+	return gen, trials['pairings'], trials['leftovers']
+
+
+def outcome(gen, survivors):
+	#everything combat changes, by slot
+	population = gen.population
+	return (sorted(survivors), list(gen.predator_slots), list(gen.prey_slots), list(population.alive),
+		list(population.fortitude))
+
+
+class ParallelCombatTest(unittest.TestCase):
+
+	def test_parallel_equals_serial(self):
+		gen, pairings, leftovers = paired_generation(120)
+		serial = outcome(gen, gen.run_combat_trials(pairings, leftovers, seed=7))
+		for workers in (1, 2):
+			gen, pairings, leftovers = paired_generation(120)
+			parallel = outcome(gen, gen.run_parallel_combat_trials(pairings, leftovers, workers, 7))
+			self.assertEqual(parallel, serial)
+
+	def test_epoch_pool(self):
+		#a run on one pool kept for every generation comes out as it does on one process, and the pool is shut down
+		counters = (Organism.organism_counter, Generation.generation_counter)
+		serial = Epoch(150, 3, seed=3, sink=NullSink()).simulate()
+		Organism.organism_counter, Generation.generation_counter = counters
+		parallel = Epoch(150, 3, seed=3, workers=2, sink=NullSink()).simulate()
+		self.assertEqual(parallel.summaries, serial.summaries)
+		self.assertIsNone(parallel.pool)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,60 @@
+"""
+Checks RunningStats against the same statistics worked out from scratch, as organisms come and go.
+
+	python -m unittest test_stats
+"""
+
+from __future__ import division, print_function
+
+import random
+import unittest
+
+from thehunt import RunningStats
+
+
+def histogram(values, width):
+	bins = {}
+	for value in values:
+		bins[value // width * width] = bins.get(value // width * width, 0) + 1
+	return sorted(bins.items())
+
+
+class RunningStatsTest(unittest.TestCase):
+
+	def check(self, stats, values):
+		self.assertEqual(stats.count, len(values))
+		self.assertEqual(stats.min(), min(values) if values else None)
+		self.assertEqual(stats.max(), max(values) if values else None)
+		self.assertEqual(stats.int_mean(), sum(values) // len(values) if values else None)
+		for width in (1, 10):
+			self.assertEqual(stats.histogram(width), histogram(values, width))
+
+	def test_add_and_remove(self):
+		rng = random.Random(1)
+		values = [rng.randrange(0, 60) for i in range(200)]
+		stats = RunningStats(values)
+		self.check(stats, values)
+		while values:
+			if rng.random() < 0.3:
+				value = rng.randrange(0, 60)
+				values.append(value)
+				stats.add(value)
+			else:
+				#take away the extremes more often than chance would, so they get rescanned for
+				value = rng.choice([min(values), max(values), rng.choice(values)])
+				values.remove(value)
+				stats.remove(value)
+			self.check(stats, values)
+
+	def test_setstate(self):
+		stats = RunningStats([5, 3, 9, 9, 14])
+		stats.histogram(10)
+		restored = RunningStats()
+		restored.setstate(stats.getstate())
+		self.check(restored, [5, 3, 9, 9, 14])
+		restored.remove(14)
+		self.check(restored, [5, 3, 9, 9])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -1,5 +1,222 @@
+from __future__ import division, print_function
+
 import random
 import math
+import array
+import binascii
+import contextlib
+import csv
+import hashlib
+import inspect
+import itertools
+import multiprocessing
+import json
+import mmap
+import operator
+import os
+import struct
+import sys
+import time
+import traceback
+
+try:
+	import numpy
+except ImportError:
+	#numpy is only needed for the vectorized combat engine
+	numpy = None
+
+try:
+	import pyarrow
+	import pyarrow.ipc
+except ImportError:
+	#pyarrow is only needed for ExportSink's Arrow files
+	pyarrow = None
+
+#the farthest a single step can move an organism
+SQRT2 = math.sqrt(2)
+
+#the same code runs on Python 2.7 and 3.6+; these cover the few places where they differ
+if sys.version_info[0] >= 3:
+	raw_input = input
+	xrange = range
+
+def length_hint(iterator):
+	#operator.length_hint on Python 3, the iterator's own __length_hint__ on Python 2
+	if hasattr(operator, 'length_hint'):
+		return operator.length_hint(iterator)
+	return iterator.__length_hint__()
+
+def array_to_bytes(column):
+	return column.tobytes() if hasattr(column, 'tobytes') else column.tostring()
+
+def array_from_bytes(column, data):
+	#appends the values packed in data to the array column
+	if hasattr(column, 'frombytes'):
+		column.frombytes(data)
+	else:
+		column.fromstring(data)
+
+def open_csv(path, mode):
+	#a file for the csv module: binary on Python 2, text with newline translation off on Python 3
+	if sys.version_info[0] >= 3:
+		return open(path, mode, newline='')
+	return open(path, mode + 'b')
+
+
+
+def derive_stats(rawSpeed, rawWillpower, rawPerception, rawStealth, rawFortitude, rawPower, rawVirility, trunc=int):
+	"""
+	Weights raw attributes against one another using the modulation rules described in Organism.__init__.
+	Returns (speed, willpower, perception, stealth, fortitude, power, virility, hunger)
+
+	Works on whole numpy columns too, given a trunc that truncates an array (see Population.breed_batch)
+	"""
+	speed = rawSpeed - trunc( ((rawFortitude + rawPower)//2) * 0.1 ) + trunc ( rawWillpower * 0.15)
+	willpower = rawWillpower + trunc( rawPower * 0.2 )
+	perception = rawPerception + trunc (rawWillpower * 0.1 )
+	stealth = rawStealth - trunc( rawFortitude * 0.2 ) + trunc( rawPerception * 0.35 )
+	fortitude = rawFortitude - trunc( rawStealth * 0.2 ) + trunc( rawPower * 0.1 )
+	power = rawPower + trunc( rawSpeed * 0.1 ) + trunc( rawPower * 0.2 )
+	virility = rawVirility + trunc( rawFortitude * 0.15 )
+
+	#Hunger is the average of ALL variables
+	hunger = (speed + willpower + perception + stealth + fortitude + power + virility)//6
+
+	return (speed, willpower, perception, stealth, fortitude, power, virility, hunger)
+
+
+def combat_profile(speed, perception, power):
+	"""
+	Everything a duel derives from stats that don't change during it, so it isn't recomputed on every turn: (steps per
+	round, perception squared, damage bonus, run distance). Perception squared is compared against four times squared 
+	distances, all in integers (see Organism.sense_other). Fortitude does change, so the distance a predator is forced
+	off is still worked out when it happens.
+	"""
+	return (
+		#steps per round
+		int( speed * .15 )+1,
+		#sensing range is perception / 2; squared, for comparing against squared distances
+		perception * perception,
+		#added to every blow this organism lands
+		int( power * 0.05 ),
+		#the farthest (per axis, less one) prey gets when it runs away
+		int( speed * 0.1 ) + 1)
+
+
+
+class BufferedRandom(random.Random):
+	"""
+	A random.Random that also serves dice: die(low, high) returns a function rolling randrange(low, high) that hands
+	out values from a pre-rolled buffer. A buffer is filled all at once from a single getrandbits call and the rolls
+	are read off it by a C-level iterator, so a roll costs a fraction of a randrange call. The dice a duel throws
+	(wander, d20, d5) are ready as attributes. Everything else, randrange, random, sample, getrandbits, is plain
+	random.Random, drawing straight from the same generator.
+
+	Seeding it seeds the dice too, and getstate()/setstate() include the unused part of every buffer, so a run on a
+	BufferedRandom is exactly as reproducible as one on random.Random. The stream of values is not the same as 
+	random.Random's, of course.
+	"""
+
+	#rolls per buffer; a die's first buffer is small and they double up to this, so short-lived generators stay cheap
+	buffer_size = 4096
+	first_buffer_size = 64
+
+	def seed(self, a=None):
+		random.Random.seed(self, a)
+		self.reset_dice({})
+
+	def die(self, low, high):
+		#a function with no arguments returning randrange(low, high)
+		try:
+			return self._dice[(low, high)]
+		except KeyError:
+			self._dice[(low, high)] = roll = self._make_die(low, high, [], self.first_buffer_size)
+			return roll
+
+	def getstate(self):
+		pending = {}
+		for key, (buffered, rolls, size) in self._buffers.items():
+			pending[key] = (buffered[len(buffered) - length_hint(rolls):], size)
+		return (random.Random.getstate(self), pending)
+
+	def setstate(self, state):
+		internal_state, pending = state
+		random.Random.setstate(self, internal_state)
+		self.reset_dice(pending)
+
+	def reset_dice(self, pending):
+		#throws away every die and buffer, then rebuilds them from pending, {(low, high): (unused rolls, next size)}
+		self._dice = {}
+		self._buffers = {}
+		for (low, high), (rolls, size) in pending.items():
+			self._dice[(low, high)] = self._make_die(low, high, list(rolls), size)
+		self.wander = self.die(-1, 2)
+		self.d20 = self.die(1, 21)
+		self.d5 = self.die(1, 6)
+
+	def _make_die(self, low, high, rolls, size):
+		#itertools.chain strings the buffers together as they are filled; its next() is the die
+		chain = itertools.chain.from_iterable(self._fill(low, high, rolls, size))
+		return chain.__next__ if hasattr(chain, '__next__') else chain.next
+
+	def _fill(self, low, high, rolls, size):
+		#generator of buffers for die (low, high); _buffers keeps the one being read, so getstate can see how far along
+		#it is. rolls, if any, are handed out before any new ones are rolled
+		key = (low, high)
+		width = high - low
+		while True:
+			if not rolls:
+				#signed, so that they come out as ints rather than longs
+				words = array.array('i', binascii.unhexlify('%0*x' % (8 * size, random.Random.getrandbits(self, 32 * size))))
+				if sys.byteorder == 'little':
+					#read the words big-endian, so a seed gives the same rolls on every machine
+					words.byteswap()
+				#scale each 32-bit word into the range; the bias is at most width / 2**32
+				rolls = [low + (((word + 2147483648) * width) >> 32) for word in words]
+				size = min(size * 2, self.buffer_size)
+			reading = iter(rolls)
+			self._buffers[key] = (rolls, reading, size)
+			rolls = []
+			yield reading
+
+
+#the generator duels roll on when they aren't given one
+dice = BufferedRandom()
+
+
+class RandomDice(object):
+	"""
+	Dice for code that hands in a plain random.Random (or the random module itself) where a BufferedRandom is expected:
+	the same die(), wander, d20 and d5, plus randrange, random and getrandbits, all drawn straight from that generator 
+	by randrange, one call per roll. It is as slow as the code before BufferedRandom, but the caller's generator is the
+	only one used, so its seeding and state carry on working as they always have.
+	"""
+
+	def __init__(self, rng):
+		self.rng = rng
+		self.wander = self.die(-1, 2)
+		self.d20 = self.die(1, 21)
+		self.d5 = self.die(1, 6)
+
+	def die(self, low, high):
+		randrange = self.rng.randrange
+		return lambda: randrange(low, high)
+
+	def randrange(self, *args):
+		return self.rng.randrange(*args)
+
+	def random(self):
+		return self.rng.random()
+
+	def getrandbits(self, k):
+		return self.rng.getrandbits(k)
+
+
+def as_dice(rng):
+	#rng ready to roll dice on: a BufferedRandom (or RandomDice) as it is, anything else wrapped in a RandomDice
+	if isinstance(rng, (BufferedRandom, RandomDice)):
+		return rng
+	return RandomDice(rng)
 
 
 
@@ -10,35 +227,45 @@ class Organism(object):
 	predator_counter = 0
 	prey_counter = 0
 
+	#everything run_duel needs from an organism; see combat_record
+	combat_record_fields = ('id', 'predator', 'speed', 'willpower', 'perception', 'stealth', 'fortitude', 'power',
+		'rawFortitude', 'rawStealth', 'rawPower')
+
 	def __init__(self, **kwargs):
 		"""
 		If the organism is from generation 0, its base attributes are initialized 
 		with random values. If the organism is the result of the mating of two parents, 
 		we use values from those parents' attributes to set new values. 
+		The rolls come from the rng keyword: a BufferedRandom (the module's dice by default) or a plain random.Random.
 		"""
+		rng = as_dice(kwargs.get('rng', dice))
 
 		if kwargs.get('parent_dict', None) is not None:
 			#Each attribute will be keyed to a tuple. The new raw attributes will fall in a range 
-			#between the tuple's values
+			#between the tuple's values; randrange(low, high+1) rolled off one random() as Population.breed does
 			d = kwargs['parent_dict']
-			self.rawSpeed = random.randrange( sorted(d['Speed'])[0], sorted(d['Speed'])[1]+1 )
-			self.rawWillpower = random.randrange( sorted(d['Willpower'])[0], sorted(d['Willpower'])[1]+1 )
-			self.rawPerception = random.randrange( sorted(d['Perception'])[0], sorted(d['Perception'])[1]+1 )
-			self.rawStealth = random.randrange( sorted(d['Stealth'])[0], sorted(d['Stealth'])[1]+1 )
-			self.rawFortitude = random.randrange( sorted(d['Fortitude'])[0], sorted(d['Fortitude'])[1]+1 )
-			self.rawPower = random.randrange( sorted(d['Power'])[0], sorted(d['Power'])[1]+1 )
-			self.rawVirility = random.randrange( sorted(d['Virility'])[0], sorted(d['Virility'])[1]+1 )
+			def inherit(name):
+				low, high = sorted(d[name])
+				return low + int(rng.random() * (high - low + 1))
+			self.rawSpeed = inherit('Speed')
+			self.rawWillpower = inherit('Willpower')
+			self.rawPerception = inherit('Perception')
+			self.rawStealth = inherit('Stealth')
+			self.rawFortitude = inherit('Fortitude')
+			self.rawPower = inherit('Power')
+			self.rawVirility = inherit('Virility')
 
 
 		else:
 			#generation 0, seed base non-derived attributes with random numbers
-			self.rawSpeed = random.randrange(0,101)
-			self.rawWillpower = random.randrange(0,101)
-			self.rawPerception = random.randrange(0,101)
-			self.rawStealth = random.randrange(0,101)
-			self.rawFortitude = random.randrange(0,101)
-			self.rawPower = random.randrange(0,101)
-			self.rawVirility = random.randrange(0,101)
+			stat = rng.die(0, 101)
+			self.rawSpeed = stat()
+			self.rawWillpower = stat()
+			self.rawPerception = stat()
+			self.rawStealth = stat()
+			self.rawFortitude = stat()
+			self.rawPower = stat()
+			self.rawVirility = stat()
 
 
 
@@ -68,16 +295,9 @@ class Organism(object):
 		speed = 56 - ((( 74 + 34 ) / 2) * 0.2)
 		"""
 
-		self.speed = self.rawSpeed - int( float((self.rawFortitude + self.rawPower)/2) * 0.1 ) + int ( self.rawWillpower * 0.15)
-		self.willpower = self.rawWillpower + int( self.rawPower * 0.2 )
-		self.perception = self.rawPerception + int (self.rawWillpower * 0.1 )
-		self.stealth = self.rawStealth - int( self.rawFortitude * 0.2 ) + int( self.rawPerception * 0.35 )
-		self.fortitude = self.rawFortitude - int( self.rawStealth * 0.2 ) + int( self.rawPower * 0.1 )
-		self.power = self.rawPower + int( self.rawSpeed * 0.1 ) + int( self.rawPower * 0.2 )
-		self.virility = self.rawVirility + int( self.rawFortitude * 0.15 )
-
-		#Hunger is the average of ALL variables
-		self.hunger = int( float((self.speed + self.willpower + self.perception + self.stealth + self.fortitude + self.power + self.virility)/6) )
+		(self.speed, self.willpower, self.perception, self.stealth, self.fortitude, self.power, self.virility,
+			self.hunger) = derive_stats(self.rawSpeed, self.rawWillpower, self.rawPerception, self.rawStealth,
+			self.rawFortitude, self.rawPower, self.rawVirility)
 		
 		#Finally, determine if the organism is viable (any negative attributes = nonviable)
 		#Also set self.alive here; we flip this flag later if the organism dies during testing of their generation
@@ -98,29 +318,33 @@ class Organism(object):
 		if kwargs.get('parent_dict', None) is not None:
 			self.predator = kwargs['parent_dict']['Predator']
 		else:
-			if random.randrange(0,2):
+			if rng.die(0, 2)():
 				self.predator = True
 				Organism.predator_counter += 1
 			else:
 				self.predator = False
 				Organism.prey_counter += 1
 
+		self.prepare_for_combat()
+
 
-	def step(self, self_location, approach=None, retreat=None):
+	def step(self, self_location, approach=None, retreat=None, rng=dice):
 		"""
 		Combat trials take place on an infinitely large coordinate grid. Organisms can move around the grid one horizontal,
 		vertical, or diagonal step at a time. In practice this amounts to increment or decrementing the x and/or y coordinate.
 		We structure the logic so that diagonal moves (in/decrementing both x and y) is preferred since it's technically "faster."
 		If given a value for approach or retreat (a tuple of x,y coordinates), we will move towards/away from the coordinates
-		as appropriate. If not, we wander around randomly.
+		as appropriate. If not, we wander around randomly, with rng's wander die. rng has to serve dice: a BufferedRandom,
+		or a plain random.Random wrapped by as_dice (run_duel does that for its players). It isn't checked here, since
+		this is called on every tick.
 
 		Returns new (x,y) coordinates relevant to the grid system
 		"""
 
 		if not approach and not retreat:
 			#random wandering; add -1, 0 or 1 to current coordinates
-			new_x = self_location[0] + random.randrange(-1,2)
-			new_y = self_location[1] + random.randrange(-1,2)
+			new_x = self_location[0] + rng.wander()
+			new_y = self_location[1] + rng.wander()
 
 
 		elif approach:
@@ -145,14 +369,14 @@ class Organism(object):
 			elif retreat[0] < self_location[0]:
 				new_x = self_location[0] + 1
 			else: #retreat[0] == self_location[0]; panic and maybe go diagonally
-				new_x = self_location[0] + random.randrange(-1,2)
+				new_x = self_location[0] + rng.wander()
 
 			if retreat[1] > self_location[1]:
 				new_y = self_location[1] - 1
 			elif retreat[1] < self_location[1]:
 				new_y = self_location[1] + 1
 			else: #retreat[1] == self_location[1]
-				new_y = self_location[1] + random.randrange(-1,2)
+				new_y = self_location[1] + rng.wander()
 
 
 		return (new_x, new_y)
@@ -176,24 +400,26 @@ class Organism(object):
 
 
 
-	def sense_other(self, other, self_location, other_location):
+	def sense_other(self, other, self_location, other_location, rng=dice):
 		"""
 		Given another Organism and its (x,y) location on the combat grid, determines if the referenced Organism (self) can 
-		sense the other.
+		sense the other. Uses self's combat profile (see prepare_for_combat). Like step and take_combat_turn, dice come
+		from rng, a BufferedRandom (the module's dice unless told otherwise) or as_dice of a plain random.Random.
 		"""
 
-		true_distance = self.distance_to_other(self_location, other_location)
-
-		#a given organism has a maximum perception distance of (self.perception * 0.50)
-		if true_distance > ( self.perception * 0.50 ):
+		#a given organism has a maximum perception distance of (self.perception * 0.50); compared squared and doubled, 
+		#in integers: distance > perception / 2 exactly when 4 * distance**2 > perception**2
+		dx = self_location[0] - other_location[0]
+		dy = self_location[1] - other_location[1]
+		if 4 * (dx*dx + dy*dy) > self.perception_sq:
 			return False
 
 		else:
 			#sensing organism performs a 1d20 perception check against the other organism's 1d20 stealth check
-			return ( (self.perception + random.randrange(1,21)) > (other.stealth + random.randrange(1,21)) )
+			return ( (self.perception + rng.d20()) > (other.stealth + rng.d20()) )
 
 
-	def take_combat_turn(self, other, self_location, other_location):
+	def take_combat_turn(self, other, self_location, other_location, rng=dice):
 		"""
 		A combat turn has two phases, so long as Predator and Prey aren't occupying the same spot:
 		1. Determine if we can sense another organism
@@ -204,15 +430,15 @@ class Organism(object):
 		is done - prey can fight back, after all. Damage reduces fortitude, if fort falls below 0 the organism is killed.
 
 		Will either return the new coordinates of the Organism taking a turn, or a victorious object if the turn results in a
-		kill
+		kill. Both organisms need their combat profiles (see prepare_for_combat). rng is as for step.
 		"""
 		
 		if self_location == other_location:
 			if self.predator:
 				#1d20 willpower to hold down the prey; escape == False if successful
-				escape = ( (self.willpower + random.randrange(1,21)) < (other.willpower + random.randrange(1,21)) )
+				escape = ( (self.willpower + rng.d20()) < (other.willpower + rng.d20()) )
 			else:
-				escape = ( (self.willpower + random.randrange(1,21)) > (other.willpower + random.randrange(1,21)) )
+				escape = ( (self.willpower + rng.d20()) > (other.willpower + rng.d20()) )
 
 			if escape:
 				"""
@@ -222,12 +448,12 @@ class Organism(object):
 				"""
 				if self.predator:
 					#forced off!
-					new_x = self_location[0] + random.randrange(0, int(self.fortitude * 0.1) + 1) + 1
-					new_y = self_location[1] + random.randrange(0, int(self.fortitude * 0.1) + 1) + 1
+					new_x = self_location[0] + rng.randrange(0, int(self.fortitude * 0.1) + 1) + 1
+					new_y = self_location[1] + rng.randrange(0, int(self.fortitude * 0.1) + 1) + 1
 				else:
 					#ran away!
-					new_x = self_location[0] + random.randrange(0, int(self.speed * 0.1) + 1) + 1
-					new_y = self_location[1] + random.randrange(0, int(self.speed * 0.1) + 1) + 1
+					new_x = self_location[0] + rng.randrange(0, self.run_distance) + 1
+					new_y = self_location[1] + rng.randrange(0, self.run_distance) + 1
 
 				return (new_x, new_y)
 
@@ -235,9 +461,9 @@ class Organism(object):
 				#no escape; predator strikes prey. 
 				if self.predator:
 					#roll for damage; 1d5 plus power factor
-					damage = random.randrange(1,6) + int(self.power * 0.05)
+					damage = rng.d5() + self.damage_bonus
 					#predators get a 5% chance to crit & deal double damage
-					if random.randrange(0,20) == 0:
+					if rng.d20() == 20:
 						damage *= 2
 					
 					other.fortitude -= damage
@@ -246,41 +472,65 @@ class Organism(object):
 						return self
 
 					#prey strikes back; no critical strikes for prey
- 					revenge = random.randrange(1,6) + int(other.power * 0.05)
- 					self.fortitude -= revenge
- 					if self.fortitude <= 0:
- 						self.alive = False
- 						return other
+					revenge = rng.d5() + other.damage_bonus
+					self.fortitude -= revenge
+					if self.fortitude <= 0:
+						self.alive = False
+						return other
 
- 					#if any of these blows had been fatal to either party we'd have returned a value. since we haven't, just
- 					#return current location
- 					return self_location
+					#if any of these blows had been fatal to either party we'd have returned a value. since we haven't, just
+					#return current location
+					return self_location
 
 
- 				else:
- 					#predator still strikes first; sucks to be prey. should've been better at running away. no mortal strike though
- 					damage = random.randrange(1,6) + int(other.power * 0.05)
- 					self.fortitude -= damage
- 					if self.fortitude <= 0:
- 						self.alive = False
- 						return other
-
- 					revenge = random.randrange(1,6) + int(self.power * 0.05)
- 					other.fortitude -= revenge
- 					if other.fortitude <= 0:
- 						other.alive = False
- 						return self
+				else:
+					#predator still strikes first; sucks to be prey. should've been better at running away. no mortal strike though
+					damage = rng.d5() + other.damage_bonus
+					self.fortitude -= damage
+					if self.fortitude <= 0:
+						self.alive = False
+						return other
+
+					revenge = rng.d5() + self.damage_bonus
+					other.fortitude -= revenge
+					if other.fortitude <= 0:
+						other.alive = False
+						return self
 
- 					return self_location
+					return self_location
 
 
-		elif self.sense_other(other, self_location, other_location):
+		elif self.sense_other(other, self_location, other_location, rng):
 			if self.predator:
-				return self.step(self_location, approach=other_location)
+				return self.step(self_location, approach=other_location, rng=rng)
 			else:
-				return self.step(self_location, retreat=other_location)
+				return self.step(self_location, retreat=other_location, rng=rng)
 		else:
-			return self.step(self_location)
+			return self.step(self_location, rng=rng)
+
+	def prepare_for_combat(self):
+		"""
+		Works out the combat profile (see combat_profile) from the organism's current stats. A new Organism has it 
+		already; run_duel works it out again for both players, since stand-ins rebuilt by from_combat_record don't.
+		"""
+		self.turns, self.perception_sq, self.damage_bonus, self.run_distance = combat_profile(self.speed,
+			self.perception, self.power)
+		return self
+
+	def combat_record(self):
+		#the attributes a duel reads or writes, as a plain tuple that is cheap to send to another process
+		return tuple(getattr(self, attr) for attr in Organism.combat_record_fields)
+
+	@classmethod
+	def from_combat_record(cls, record):
+		"""
+		Rebuilds a stand-in Organism from combat_record() output without rolling any dice or touching the counters. 
+		It is only good for fighting a duel.
+		"""
+		organism = cls.__new__(cls)
+		organism.__dict__.update(zip(cls.combat_record_fields, record))
+		organism.alive = True
+		return organism
 
 	def reset_fort(self):
 		#Resets Fortitude stat after surviving a combat round to prevent some weird lamarckian breeding of wounds
@@ -289,31 +539,1329 @@ class Organism(object):
 
 
 	def quick_repr(self):
-		print "Quick representation"
-		print "ID#: {}".format(self.id)
-		print "Speed: {} (Raw: {})".format(self.speed, self.rawSpeed)
-		print "Willpower: {} (Raw: {})".format(self.willpower, self.rawWillpower)
-		print "Perception: {} (Raw: {})".format(self.perception, self.rawPerception)
-		print "Stealth: {} (Raw: {})".format(self.stealth, self.rawStealth)
-		print "Fortitude: {} (Raw: {})".format(self.fortitude, self.rawFortitude)
-		print "Power: {} (Raw: {})".format(self.power, self.rawPower)
-		print "Virility: {} (Raw: {})".format(self.virility, self.rawVirility)
-		print "Hunger: {}".format(self.hunger)
-		print "Viable: {}".format(self.viable)
+		print("Quick representation")
+		print("ID#: {}".format(self.id))
+		print("Speed: {} (Raw: {})".format(self.speed, self.rawSpeed))
+		print("Willpower: {} (Raw: {})".format(self.willpower, self.rawWillpower))
+		print("Perception: {} (Raw: {})".format(self.perception, self.rawPerception))
+		print("Stealth: {} (Raw: {})".format(self.stealth, self.rawStealth))
+		print("Fortitude: {} (Raw: {})".format(self.fortitude, self.rawFortitude))
+		print("Power: {} (Raw: {})".format(self.power, self.rawPower))
+		print("Virility: {} (Raw: {})".format(self.virility, self.rawVirility))
+		print("Hunger: {}".format(self.hunger))
+		print("Viable: {}".format(self.viable))
 
 	def __repr__(self):
 		return "Organism {} (p = {})".format(self.id, self.predator)
 
 
+class CountingOrganism(Organism):
+	"""
+	A duel stand-in that counts its turns into a Metrics tally shared with its opponent: sense_other calls and 
+	successes, steps, and turns begun locked in combat along with the escapes among them. Organism itself carries no
+	counting code, so uninstrumented duels don't pay for any.
+	"""
+
+	@classmethod
+	def from_combat_record(cls, record, tally):
+		organism = super(CountingOrganism, cls).from_combat_record(record)
+		organism.tally = tally
+		return organism
+
+	def step(self, self_location, approach=None, retreat=None, rng=dice):
+		self.tally['steps'] += 1
+		return Organism.step(self, self_location, approach, retreat, rng)
+
+	def sense_other(self, other, self_location, other_location, rng=dice):
+		sensed = Organism.sense_other(self, other, self_location, other_location, rng)
+		self.tally['sense_checks'] += 1
+		self.tally['senses'] += sensed
+		return sensed
+
+	def take_combat_turn(self, other, self_location, other_location, rng=dice):
+		outcome = Organism.take_combat_turn(self, other, self_location, other_location, rng)
+		if self_location == other_location:
+			self.tally['engagements'] += 1
+			#a blow leaves both where they were, a kill returns the victor; anything else is a getaway
+			if isinstance(outcome, tuple) and outcome != self_location:
+				self.tally['escapes'] += 1
+		return outcome
+
+
+class RecordingOrganism(CountingOrganism):
+	"""
+	A duel stand-in that writes each of its turns to a DuelRecorder as an event: where it ended up, where the other 
+	was, both fortitudes and the damage each took, and what kind of turn it was (see DuelRecorder). It counts into a 
+	tally like a CountingOrganism as well, so recorded duels can still be instrumented. Only sampled duels use it.
+	"""
+
+	@classmethod
+	def from_combat_record(cls, record, tally, recorder):
+		organism = super(RecordingOrganism, cls).from_combat_record(record, tally)
+		organism.recorder = recorder
+		organism.sensed = False
+		return organism
+
+	def sense_other(self, other, self_location, other_location, rng=dice):
+		self.sensed = CountingOrganism.sense_other(self, other, self_location, other_location, rng)
+		return self.sensed
+
+	def take_combat_turn(self, other, self_location, other_location, rng=dice):
+		self.sensed = False
+		fortitude, other_fortitude = self.fortitude, other.fortitude
+		outcome = CountingOrganism.take_combat_turn(self, other, self_location, other_location, rng)
+		if self_location == other_location:
+			if not isinstance(outcome, tuple):
+				kind = DuelRecorder.KILL
+			elif outcome == self_location:
+				kind = DuelRecorder.BLOWS
+			else:
+				kind = DuelRecorder.ESCAPE
+		else:
+			kind = DuelRecorder.SENSE if self.sensed else DuelRecorder.WANDER
+		self.recorder.event(kind, self.predator, outcome if isinstance(outcome, tuple) else self_location, other_location,
+			self.fortitude, other.fortitude, fortitude - self.fortitude, other_fortitude - other.fortitude)
+		return outcome
+
+
+class DuelRecorder(object):
+	"""
+	Records a sample of the duels run_combat_trials plays, turn by turn, for replay.py to play back. Each duel is 
+	picked with probability sample_rate, on dice of the recorder's own (seeded with seed), so recording doesn't change
+	how any duel goes; picked duels are fought by RecordingOrganisms.
+
+	Events are fixed-width records (event_struct): duel number, round, kind, actor (1 for the predator, whose position
+	comes first), the actor's and the other's position, both fortitudes afterwards and the damage each took (for SKIP,
+	the number of rounds skipped). They go into a ring buffer of capacity events preallocated up front. With a path, 
+	the buffer is appended to that file whenever it fills up and on flush() or close(), and every recorded duel's
+	details (generation, duel number, both combat records, the winner and the rounds played) go to path + '.duels' as 
+	a JSON line. Without one, the buffer just holds the latest capacity events; see events().
+	"""
+
+	#event kinds
+	PLACE, SKIP, WANDER, SENSE, ESCAPE, BLOWS, KILL, STARVE = range(0, 8)
+	kind_names = ('place', 'skip', 'wander', 'sense', 'escape', 'blows', 'kill', 'starve')
+
+	event_struct = struct.Struct('<IiBB2x8i')
+	event_size = event_struct.size
+
+	def __init__(self, path=None, sample_rate=0.01, capacity=65536, seed=None):
+		self.path = path
+		self.sample_rate = sample_rate
+		self.capacity = capacity
+		self.rng = random.Random(seed)
+		self.buffer = bytearray(capacity * DuelRecorder.event_size)
+		#events written in all, and how many of them have been written out to path
+		self.written = 0
+		self.flushed = 0
+		#the duel being recorded, its round, and every recorded duel's details
+		self.duel = -1
+		self.round = 0
+		self.duels = []
+		if path is not None:
+			#start both files afresh
+			open(path, 'wb').close()
+			open(path + '.duels', 'w').close()
+
+	def sampled(self):
+		#whether to record the next duel
+		return self.rng.random() < self.sample_rate
+
+	def begin_duel(self, generation_id, pairing, predator_record, prey_record):
+		self.duel += 1
+		self.round = 0
+		self.duels.append({'duel': self.duel, 'generation': generation_id, 'pairing': pairing, 
+			'predator': list(predator_record), 'prey': list(prey_record)})
+
+	def end_duel(self, predator_won):
+		details = self.duels[-1]
+		details['predator_won'] = bool(predator_won)
+		details['rounds'] = self.round
+		if self.path is not None:
+			with open(self.path + '.duels', 'a') as f:
+				f.write(json.dumps(details) + '\n')
+			#the details are on disk; only the latest are kept in memory
+			del self.duels[:-1]
+
+	def event(self, kind, actor, location, other_location, fortitude, other_fortitude, damage=0, other_damage=0):
+		DuelRecorder.event_struct.pack_into(self.buffer, (self.written % self.capacity) * DuelRecorder.event_size,
+			self.duel, self.round, kind, actor, location[0], location[1], other_location[0], other_location[1],
+			fortitude, other_fortitude, damage, other_damage)
+		self.written += 1
+		if self.path is not None and self.written - self.flushed == self.capacity:
+			self.flush()
+
+	def flush(self):
+		#appends the events not yet written out to path
+		if self.path is None or self.written == self.flushed:
+			return
+		size = DuelRecorder.event_size
+		start, end = self.flushed % self.capacity, self.written % self.capacity
+		with open(self.path, 'ab') as f:
+			if start < end:
+				f.write(self.buffer[start * size:end * size])
+			else:
+				f.write(self.buffer[start * size:])
+				f.write(self.buffer[:end * size])
+		self.flushed = self.written
+
+	def close(self):
+		self.flush()
+
+	def events(self):
+		#the events still in the buffer, oldest first, as tuples in event_struct order
+		size = DuelRecorder.event_size
+		first = max(0, self.written - self.capacity)
+		return [DuelRecorder.event_struct.unpack_from(self.buffer, (i % self.capacity) * size) for i in range(first, self.written)]
+
+	@staticmethod
+	def read(path):
+		"""
+		Loads a recording made with a path: returns (details, events), details being the recorded duels' JSON lines 
+		in order and events a dict of duel number -> that duel's event tuples.
+		"""
+		with open(path + '.duels') as f:
+			details = [json.loads(line) for line in f if line.strip()]
+		events = {}
+		with open(path, 'rb') as f:
+			data = f.read()
+		size = DuelRecorder.event_size
+		for offset in range(0, len(data) - len(data) % size, size):
+			event = DuelRecorder.event_struct.unpack_from(data, offset)
+			events.setdefault(event[0], []).append(event)
+		return details, events
+
+
+
+class Population(object):
+	"""
+	A struct-of-arrays home for a large number of Organisms. Every attribute is one typed column (an array.array, or a 
+	bytearray for the predator/alive/viable flags) and each organism is a row, or "slot", across all of them, instead
+	of a separate object with its own __dict__. Rows are never removed; a death just clears the alive flag.
+
+	Code that wants the per-organism API can still get one: organism(slot) returns an OrganismView over a row, and
+	slot_of(id) finds an organism's row by its id.
+	"""
+
+	#C long; stats grow from generation to generation, so leave them plenty of headroom
+	typecode = 'l'
+
+	raw_columns = ('rawSpeed', 'rawWillpower', 'rawPerception', 'rawStealth', 'rawFortitude', 'rawPower', 'rawVirility')
+	derived_columns = ('speed', 'willpower', 'perception', 'stealth', 'fortitude', 'power', 'virility', 'hunger')
+	stat_columns = raw_columns + derived_columns
+	flag_columns = ('predator', 'alive', 'viable')
+
+	#raw attribute i of an offspring is rolled between its parents' values of inheritance[i] (see breed). Willpower
+	#comes from the parents' speed, as it always has.
+	inheritance = ('speed', 'speed', 'perception', 'stealth', 'fortitude', 'power', 'virility')
+
+	def __init__(self):
+		self.id = array.array(Population.typecode)
+		#organism id -> slot
+		self.index = {}
+		for name in Population.stat_columns:
+			setattr(self, name, array.array(Population.typecode))
+		for name in Population.flag_columns:
+			setattr(self, name, bytearray())
+
+	def __len__(self):
+		return len(self.id)
+
+	def add(self, raws, predator):
+		"""
+		Appends an organism given its raw attributes (in raw_columns order): derives the rest, checks viability and
+		hands out the next Organism id, just like Organism.__init__. Returns the new slot
+		"""
+		slot = len(self.id)
+		derived = derive_stats(*raws)
+		for name, value in zip(Population.raw_columns, raws):
+			getattr(self, name).append(value)
+		for name, value in zip(Population.derived_columns, derived):
+			getattr(self, name).append(value)
+
+		#any negative attribute (hunger aside) = nonviable
+		viable = not any(attr < 0 for attr in derived[:7])
+		self.predator.append(1 if predator else 0)
+		self.alive.append(1 if viable else 0)
+		self.viable.append(1 if viable else 0)
+
+		self.id.append(Organism.organism_counter)
+		self.index[Organism.organism_counter] = slot
+		Organism.organism_counter += 1
+		return slot
+
+	def spawn(self, rng=dice):
+		#adds a generation 0 organism: random raw attributes, randomly assigned to a side (see Organism.__init__)
+		rng = as_dice(rng)
+		stat = rng.die(0, 101)
+		raws = [stat() for x in range(0, 7)]
+		if rng.die(0, 2)():
+			predator = True
+			Organism.predator_counter += 1
+		else:
+			predator = False
+			Organism.prey_counter += 1
+		return self.add(raws, predator)
+
+	def breed(self, parents, a, m):
+		"""
+		Adds the offspring of rows a and m of the parents Population. Each raw attribute falls in the range between
+		the two parents' values of the matching inheritance attribute; the offspring is on the same side as its parents.
+		Returns the new slot
+		"""
+		raws = []
+		for name in Population.inheritance:
+			column = getattr(parents, name)
+			low, high = sorted((column[a], column[m]))
+			#randrange(low, high+1) as Python 2 rolls it, on any Python (see breed_batch)
+			raws.append(low + int(random.random() * (high - low + 1)))
+		return self.add(raws, parents.predator[a])
+
+	def breed_batch(self, parents, a_slots, m_slots):
+		"""
+		breed() for a whole list of matings at once: offspring i has parents a_slots[i] and m_slots[i]. The raw 
+		attributes are rolled one column at a time, then the derived stats and viability of the whole batch are worked 
+		out in one go (as numpy columns, when numpy is available) and appended in bulk. Returns the new slots
+		"""
+		n = len(a_slots)
+		first_slot = len(self.id)
+		if n == 0:
+			return []
+
+		#same roll as random.randrange(low, high+1), without the per-call overhead
+		rand = random.random
+		raws = []
+		for name in Population.inheritance:
+			column = getattr(parents, name)
+			values = []
+			for a, m in zip(a_slots, m_slots):
+				low, high = column[a], column[m]
+				if low > high:
+					low, high = high, low
+				values.append(low + int(rand() * (high - low + 1)))
+			raws.append(values)
+
+		if numpy is not None:
+			derived = derive_stats(*[numpy.array(values, dtype=numpy.int64) for values in raws],
+				trunc=lambda values: values.astype(numpy.int64))
+			viable = (numpy.vstack(derived[:7]) >= 0).all(axis=0).tolist()
+			derived = [values.tolist() for values in derived]
+		else:
+			derived = list(zip(*map(derive_stats, *raws)))
+			viable = [min(stats[:7]) >= 0 for stats in zip(*derived)]
+
+		for name, values in zip(Population.raw_columns, raws):
+			getattr(self, name).extend(values)
+		for name, values in zip(Population.derived_columns, derived):
+			getattr(self, name).extend(values)
+
+		self.predator.extend(parents.predator[a] for a in a_slots)
+		self.alive.extend(1 if v else 0 for v in viable)
+		self.viable.extend(1 if v else 0 for v in viable)
+
+		first_id = Organism.organism_counter
+		self.id.extend(range(first_id, first_id + n))
+		for i in range(0, n):
+			self.index[first_id + i] = first_slot + i
+		Organism.organism_counter += n
+
+		return range(first_slot, first_slot + n)
+
+	def select(self, slots):
+		#copies the given rows, ids and all, into a new Population
+		subset = Population()
+		for name in ('id',) + Population.stat_columns:
+			column = getattr(self, name)
+			setattr(subset, name, array.array(Population.typecode, [column[s] for s in slots]))
+		for name in Population.flag_columns:
+			column = getattr(self, name)
+			setattr(subset, name, bytearray(column[s] for s in slots))
+		subset.index = dict((organism_id, slot) for slot, organism_id in enumerate(subset.id))
+		return subset
+
+	def pack_rows(self, slots):
+		"""
+		The given rows as a compact, picklable record for moving organisms between processes: the predator flags and 
+		the raw columns as byte strings. Only raw attributes travel; everything else is derived again by unpack_rows.
+		"""
+		packed = {'typecode': Population.typecode, 'predator': bytes(bytearray(self.predator[s] for s in slots))}
+		for name in Population.raw_columns:
+			column = getattr(self, name)
+			packed[name] = array_to_bytes(array.array(Population.typecode, [column[s] for s in slots]))
+		return packed
+
+	def unpack_rows(self, packed):
+		#adds the organisms in a pack_rows record as new rows, with new ids; returns their slots
+		columns = []
+		for name in Population.raw_columns:
+			column = array.array(str(packed['typecode']))
+			array_from_bytes(column, packed[name])
+			columns.append(column)
+		return [self.add(raws, predator) for raws, predator in zip(zip(*columns), bytearray(packed['predator']))]
+
+	@classmethod
+	def from_organisms(cls, organisms):
+		#builds a Population out of ordinary Organism objects, keeping their ids
+		population = cls()
+		for o in organisms:
+			for name in ('id',) + Population.stat_columns:
+				getattr(population, name).append(getattr(o, name))
+			for name in Population.flag_columns:
+				getattr(population, name).append(1 if getattr(o, name) else 0)
+			population.index[o.id] = len(population.id) - 1
+		return population
+
+	def organism(self, slot):
+		return OrganismView(self, slot)
+
+	def slot_of(self, organism_id):
+		return self.index[organism_id]
+
+	def combat_record(self, slot):
+		#Organism.combat_record for a row, straight from the columns
+		return tuple(getattr(self, name)[slot] for name in Organism.combat_record_fields)
+
+	def reset_fort(self, slot):
+		self.organism(slot).reset_fort()
+
+	def numpy_column(self, name):
+		#a numpy view (not a copy) of a column; don't hold on to it while rows are being added
+		if name in Population.flag_columns:
+			return numpy.frombuffer(getattr(self, name), dtype=numpy.uint8)
+		return numpy.frombuffer(getattr(self, name), dtype=numpy.dtype(Population.typecode))
+
+
+
+class OrganismView(Organism):
+	"""
+	An Organism that is a row of a Population. Reading or setting an attribute reads or writes the matching column, so
+	all of the Organism methods work on it unchanged. The combat profile is read-only, worked out from the columns.
+	"""
+
+	def __init__(self, population, slot):
+		self.population = population
+		self.slot = slot
+
+	def __eq__(self, other):
+		return isinstance(other, OrganismView) and self.population is other.population and self.slot == other.slot
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash((id(self.population), self.slot))
+
+	def prepare_for_combat(self):
+		#a view's combat profile is worked out from its columns whenever it is read; there is nothing to store
+		return self
+
+
+def _column_property(name, flag=False):
+	def get(self):
+		value = getattr(self.population, name)[self.slot]
+		return bool(value) if flag else value
+
+	def set(self, value):
+		if flag:
+			value = 1 if value else 0
+		getattr(self.population, name)[self.slot] = value
+
+	return property(get, set)
+
+for _name in ('id',) + Population.stat_columns:
+	setattr(OrganismView, _name, _column_property(_name))
+for _name in Population.flag_columns:
+	setattr(OrganismView, _name, _column_property(_name, flag=True))
+
+def _profile_property(index):
+	#one figure of combat_profile, worked out from the columns on every read so it is never stale
+	return property(lambda self: combat_profile(self.speed, self.perception, self.power)[index])
+
+for _index, _name in enumerate(('turns', 'perception_sq', 'damage_bonus', 'run_distance')):
+	setattr(OrganismView, _name, _profile_property(_index))
+
+
+
+def choose_mates(ancestors):
+	"""
+	Picks every mating for a new generation from its ancestors (a Population). The ancestors are split into a predator 
+	and a prey mate pool once; each ancestor then takes virility/12 mates from its own pool, sampled by position with
+	itself skipped over. If that is more mates than the pool has to offer, the ancestor doesn't get to mate AT ALL,
+	simulating a sort of population collapse.
+
+	Returns two lists of slots, ancestor and mate, one entry per mating, in the order Generation has always bred them.
+	The mates are drawn under the same rules as the original one ancestor at a time breeding, but all of them before 
+	any stats are rolled, whereas the original rolls each ancestor's offspring between its draws. So for a given random
+	state the two pick different mates after the first ancestor; they agree in distribution, not roll for roll.
+	"""
+	a_slots = []
+	m_slots = []
+	for a, m in iter_matings(ancestors):
+		a_slots.append(a)
+		m_slots.append(m)
+	return a_slots, m_slots
+
+
+def iter_matings(ancestors):
+	#choose_mates one (ancestor slot, mate slot) at a time, rolling the same dice as it does, without building the lists
+	pools = ([], [])
+	position = [0] * len(ancestors)
+	for slot in range(0, len(ancestors)):
+		pool = pools[ancestors.predator[slot]]
+		position[slot] = len(pool)
+		pool.append(slot)
+
+	for a in range(0, len(ancestors)):
+		pool = pools[ancestors.predator[a]]
+		mate_counter = ancestors.virility[a]//12
+		if mate_counter > len(pool) - 1:
+			continue
+		skip = position[a]
+		for i in random.sample(xrange(len(pool) - 1), mate_counter):
+			yield a, (pool[i] if i < skip else pool[i + 1])
+
+
+def sample_matings(ancestors, matings, capacity):
+	"""
+	Reservoir-samples a stream of (ancestor slot, mate slot) matings down to at most capacity per side, so that every 
+	mating on a side has the same chance of being kept however many there are, and nothing more than the samples is
+	held. Returns (ancestor slots, mate slots, matings dropped per side as [prey, predator]), in stream order.
+	"""
+	reservoirs = ([], [])
+	seen = [0, 0]
+	for index, (a, m) in enumerate(matings):
+		side = ancestors.predator[a]
+		seen[side] += 1
+		reservoir = reservoirs[side]
+		if len(reservoir) < capacity:
+			reservoir.append((index, a, m))
+		else:
+			#Algorithm R; drawn from random() like breed_batch, so it rolls the same on any Python
+			j = int(random.random() * seen[side])
+			if j < capacity:
+				reservoir[j] = (index, a, m)
+	kept = sorted(reservoirs[0] + reservoirs[1])
+	dropped = [seen[side] - len(reservoirs[side]) for side in (0, 1)]
+	return [a for index, a, m in kept], [m for index, a, m in kept], dropped
+
+
+def run_duel(player_one, player_two, rng=dice, fast_forward=True, tally=None, trace=None):
+	"""
+	Plays out a single duel and returns the victorious Organism, with its fortitude already reset. The loser is flagged
+	as dead. rng is where the dice come from: a BufferedRandom, the module's dice by default, or a plain random.Random
+	(see as_dice).
+
+	With fast_forward, stretches of rounds in which the two are too far apart for either to sense the other are 
+	skipped: every step closes the gap by at most sqrt(2), so until it could have shrunk to the larger perception 
+	radius nothing can happen but random wandering, and the net displacement of those rounds is drawn in one go 
+	(wander_offset). The outcome distribution is unchanged; fast_forward=False steps through every tick.
+
+	tally, if given, is a Metrics.new_tally() dict that the duel's rounds are counted into. The turns themselves are 
+	only counted if the players are CountingOrganisms sharing that tally. Likewise trace, a DuelRecorder, is told about
+	the placement, fast-forwards, round numbers and starvation, and RecordingOrganism players record their turns to it.
+	"""
+	rng = as_dice(rng)
+	round_counter = 0
+	player_one.prepare_for_combat()
+	player_two.prepare_for_combat()
+	#drop the participants on a grid
+	placement = rng.die(-10, 11)
+	player_one_location = ( placement(), placement() )
+	player_two_location = ( placement(), placement() )
+	if trace is not None:
+		trace.event(DuelRecorder.PLACE, 1, player_one_location, player_two_location, player_one.fortitude, player_two.fortitude)
+
+	#each player takes a certain number of turns per cycle, determined by their Speed stat
+	player_one_turns = player_one.turns
+	player_two_turns = player_two.turns
+	perception_radius = max(player_one.perception, player_two.perception) * 0.50
+
+	while (player_one.alive and player_two.alive):
+		#take_combat_turn(self, other, self_location, other_location) returns either a new location for the entity
+		#taking the turn or a victorious organism
+
+		if fast_forward:
+			#rounds that certainly pass without either organism sensing the other (two steps of slack for rounding),
+			#stopping short of round 1000 so the starvation cutoff is still played out normally
+			gap = player_one.distance_to_other(player_one_location, player_two_location) - perception_radius
+			skip = min(int(gap / SQRT2 - 1) // (player_one_turns + player_two_turns), 999 - round_counter)
+			if skip > 0:
+				round_counter += skip
+				if tally is not None:
+					tally['skipped_rounds'] += skip
+					tally['steps'] += skip * (player_one_turns + player_two_turns)
+				player_one_location = ( player_one_location[0] + wander_offset(skip * player_one_turns, rng),
+					player_one_location[1] + wander_offset(skip * player_one_turns, rng) )
+				player_two_location = ( player_two_location[0] + wander_offset(skip * player_two_turns, rng),
+					player_two_location[1] + wander_offset(skip * player_two_turns, rng) )
+				if trace is not None:
+					trace.round = round_counter
+					trace.event(DuelRecorder.SKIP, 1, player_one_location, player_two_location, player_one.fortitude,
+						player_two.fortitude, skip)
+
+		round_counter += 1
+		if tally is not None:
+			tally['rounds'] = round_counter
+		if trace is not None:
+			trace.round = round_counter
+
+		for x in range(0, player_one_turns):
+			player_one_location = player_one.take_combat_turn(player_two, player_one_location, player_two_location, rng)
+			if player_one_location == player_one or player_one_location == player_two:
+				return player_one_location.reset_fort() #victorious object; not necessarily player one!
+
+		for x in range(0, player_two_turns):
+			player_two_location = player_two.take_combat_turn(player_one, player_two_location, player_one_location, rng)
+			if player_two_location == player_one or player_two_location == player_two:
+				return player_two_location.reset_fort() #victorious object; not necessarily player two!
+
+		if round_counter >= 1000:
+			#after 1000 rounds if both are alive, the prey escapes and the predator starves
+			if tally is not None:
+				tally['starved'] = 1
+			if trace is not None:
+				trace.event(DuelRecorder.STARVE, 1, player_one_location, player_two_location, player_one.fortitude,
+					player_two.fortitude)
+			if player_one.predator:
+				player_one.alive = False
+				return player_two.reset_fort()
+			else:
+				player_two.alive = False
+				return player_one.reset_fort()
+
+
+def wander_offset(steps, rng=dice):
+	"""
+	Net displacement along one axis after a number of random wandering steps (see Organism.step: -1, 0 or +1 each),
+	drawn exactly without taking the steps. A step moves with probability 2/3 and then goes either way with probability
+	1/2. The moving count is a binomial(steps, 2/3), sampled bit by bit against the binary expansion of 2/3 (0.101010...):
+	at each bit every undecided step is settled with probability 1/2, as a move if the bit of 2/3 is a 1.
+	"""
+	moving = 0
+	undecided = steps
+	place = 1
+	while undecided:
+		settled = _count_heads(undecided, rng)
+		if place % 2:
+			moving += settled
+		undecided -= settled
+		place += 1
+	return 2 * _count_heads(moving, rng) - moving
+
+
+def _count_heads(flips, rng):
+	#binomial(flips, 1/2): the number of set bits in that many random bits
+	if not flips:
+		return 0
+	return bin(rng.getrandbits(flips)).count('1')
+
+
+def pairing_seed(seed, index):
+	#derives the seed for one pairing's random stream from a generation seed, so that a duel's dice don't depend on
+	#which process plays it or what was played before it
+	return int(hashlib.sha1("{}:{}".format(seed, index).encode('ascii')).hexdigest(), 16)
+
+
+def run_duel_chunk(chunk):
+	"""
+	Process pool entry point for Generation.run_parallel_combat_trials. chunk is a tuple of
+	(seed, index of the first pairing, list of (predator record, prey record), fast_forward, counted).
+	Returns a list of (winner id, final player one fortitude, final player two fortitude, tally), one per pairing; 
+	tally is the duel's run_duel tally if counted is True, None otherwise.
+	"""
+	seed, start, records, fast_forward, counted = chunk
+	outcomes = []
+	for i, (player_one_record, player_two_record) in enumerate(records, start):
+		if counted:
+			tally = Metrics.new_tally()
+			player_one = CountingOrganism.from_combat_record(player_one_record, tally)
+			player_two = CountingOrganism.from_combat_record(player_two_record, tally)
+		else:
+			tally = None
+			player_one = Organism.from_combat_record(player_one_record)
+			player_two = Organism.from_combat_record(player_two_record)
+		victor = run_duel(player_one, player_two, BufferedRandom(pairing_seed(seed, i)), fast_forward, tally)
+		outcomes.append((victor.id, player_one.fortitude, player_two.fortitude, tally))
+	return outcomes
+
+
+class OutcomeTable(object):
+	"""
+	Approximate combat: empirical win probabilities for duels, keyed by bucketed stats, for run_combat_trials to 
+	settle duels with instead of playing them. A key is the matchup as the dice see it, each figure divided by width:
+	the predator's edge in sensing (its perception against the prey's stealth, less the prey's perception against its
+	stealth), then its edge in willpower, fortitude and power. Keying on all twelve stats outright spreads the duels so
+	thin that cells never fill up; these four track the outcome most closely, and speed the least.
+	Every duel that is played out exactly is counted into its key's cell; once a cell has min_samples duels, duels with
+	that key are settled by one draw against its win rate (see resolve), except for a check_fraction of them that are
+	still played out to keep an eye on the error.
+
+	The table is saved as JSON and is only good for the combat rules it was learned under: rules_hash() fingerprints
+	the source of the duel code, and load() starts afresh if it has changed (or if width has).
+	"""
+
+	version = 1
+
+	def __init__(self, path=None, width=20, min_samples=20, check_fraction=0.05):
+		self.path = path
+		self.width = width
+		self.min_samples = min_samples
+		self.check_fraction = check_fraction
+		#key -> [duels played out, predator wins]
+		self.cells = {}
+		#duels settled from the table, and played out despite a usable cell: count, predator wins and summed forecast
+		self.resolved = 0
+		self.checks = 0
+		self.check_wins = 0
+		self.check_forecast = 0.0
+		self.check_brier = 0.0
+
+	@staticmethod
+	def rules_hash():
+		#fingerprint of the code that decides duels
+		digest = hashlib.sha1()
+		for rule in (BufferedRandom.die, BufferedRandom._make_die, BufferedRandom._fill, combat_profile,
+				Organism.prepare_for_combat, Organism.step, Organism.distance_to_other, Organism.sense_other,
+				Organism.take_combat_turn, run_duel, wander_offset, _count_heads):
+			digest.update(inspect.getsource(rule).encode('utf-8'))
+		return digest.hexdigest()
+
+	@classmethod
+	def load(cls, path, **kwargs):
+		#the table saved at path, or a new one (saving to path) if there is none or it is out of date
+		table = cls(path, **kwargs)
+		try:
+			with open(path) as f:
+				saved = json.load(f)
+		except IOError:
+			return table
+		if saved['version'] != cls.version or saved['rules'] != cls.rules_hash() or saved['width'] != table.width:
+			return table
+		table.cells = dict((tuple(int(bucket) for bucket in key.split(',')), cell) for key, cell in saved['cells'].items())
+		return table
+
+	def save(self, path=None):
+		#written alongside the path and renamed over it, like checkpoints
+		path = path or self.path
+		partial = path + '.partial'
+		with open(partial, 'w') as f:
+			json.dump({
+				'version': OutcomeTable.version,
+				'rules': OutcomeTable.rules_hash(),
+				'width': self.width,
+				'cells': dict((','.join(str(bucket) for bucket in key), cell) for key, cell in self.cells.items()),
+			}, f)
+		os.rename(partial, path)
+		return path
+
+	def key(self, predator_record, prey_record):
+		#bucketed key for two Organism.combat_records
+		width = self.width
+		i_d, predator, speed, willpower, perception, stealth, fortitude, power = predator_record[:8]
+		i_d, prey, prey_speed, prey_willpower, prey_perception, prey_stealth, prey_fortitude, prey_power = prey_record[:8]
+		return ((perception - prey_stealth - prey_perception + stealth) // width, (willpower - prey_willpower) // width,
+			(fortitude - prey_fortitude) // width, (power - prey_power) // width)
+
+	def resolve(self, key, rng):
+		"""
+		Settles a duel from the table if it can: True or False for whether the predator won, or None if the duel should
+		be played out (the cell is too thin, or the duel was picked as a check). A cell with min_samples duels takes one
+		draw from rng, whether it settles the duel or picks it as a check; a missing or thinner cell takes none.
+		"""
+		cell = self.cells.get(key)
+		if cell is None or cell[0] < self.min_samples:
+			return None
+		draw = rng.random()
+		if draw < self.check_fraction:
+			return None
+		self.resolved += 1
+		return (draw - self.check_fraction) / (1 - self.check_fraction) * cell[0] < cell[1]
+
+	def observe(self, key, predator_won):
+		#counts a played out duel into its cell, and into the check figures if the table could have settled it
+		cell = self.cells.setdefault(key, [0, 0])
+		if cell[0] >= self.min_samples:
+			forecast = cell[1] / float(cell[0])
+			self.checks += 1
+			self.check_wins += predator_won
+			self.check_forecast += forecast
+			self.check_brier += (forecast - predator_won) ** 2
+		cell[0] += 1
+		cell[1] += predator_won
+
+	def error(self):
+		"""
+		How the table did on its checks: {'checks', 'observed' and 'forecast' predator win rates, 'brier' score}. 
+		None before any checks.
+		"""
+		if not self.checks:
+			return None
+		return {'checks': self.checks, 'observed': self.check_wins / float(self.checks),
+			'forecast': self.check_forecast / self.checks, 'brier': self.check_brier / self.checks}
+
+
+def run_vectorized_duels(predators, prey, rng=None, fast_forward=True, metrics=None):
+	"""
+	Plays a whole list of duels at once. predators and prey are dicts of equal-length numpy columns (speed, willpower,
+	perception, stealth, fortitude, power), and row i of predators fights row i of prey. Instead of looping over one
+	duel at a time, every duel's positions, stats and fortitude are held as columns and all of the unfinished duels
+	advance together, one speed tick at a time. Finished duels are dropped from the columns at the end of each round.
+
+	The rules are the ones in take_combat_turn and run_combat_trials; only the order the dice get rolled in differs, so
+	outcomes match the python engine in distribution rather than roll for roll. fast_forward skips out-of-range 
+	wandering per duel, exactly as run_duel does, so each duel keeps its own round count. If given a Metrics, every
+	duel's counts go into it, as they would from run_duel.
+
+	Returns three numpy arrays indexed like the inputs: (predator_won, final predator fortitude, final prey fortitude)
+	"""
+	if numpy is None:
+		raise ImportError("The vectorized combat engine requires numpy")
+
+	if rng is None:
+		#seed from the module RNG so that random.seed() still makes a run reproducible
+		rng = numpy.random.RandomState(random.getrandbits(32))
+
+	n = len(predators['speed'])
+	predator_won = numpy.zeros(n, dtype=bool)
+	final_predator_fortitude = numpy.zeros(n, dtype=numpy.int64)
+	final_prey_fortitude = numpy.zeros(n, dtype=numpy.int64)
+	if n == 0:
+		return predator_won, final_predator_fortitude, final_prey_fortitude
+
+	#one dict of columns per side; 'duel' maps a row back to its position in the input lists
+	sides = []
+	for columns in (predators, prey):
+		side = {}
+		for attr in ('speed', 'willpower', 'perception', 'stealth', 'fortitude', 'power'):
+			side[attr] = numpy.array(columns[attr], dtype=numpy.int64)
+		#drop the participants on a grid
+		side['x'] = rng.randint(-10, 11, n)
+		side['y'] = rng.randint(-10, 11, n)
+		side['turns'] = (side['speed'] * .15).astype(numpy.int64) + 1
+		if metrics is not None:
+			#each side counts its own turns; the two are added up per duel once it is over
+			for field in Metrics.turn_fields:
+				side[field] = numpy.zeros(n, dtype=numpy.int64)
+		sides.append(side)
+	pd, py = sides
+	duel = numpy.arange(n)
+	round_counter = numpy.zeros(n, dtype=numpy.int64)
+	if metrics is not None:
+		counts = dict((field, numpy.zeros(n, dtype=numpy.int64)) for field in Metrics.duel_fields)
+		skipped_rounds = numpy.zeros(n, dtype=numpy.int64)
+	perception_radius = numpy.maximum(pd['perception'], py['perception']) * 0.50
+
+	while len(duel):
+		if fast_forward:
+			#see run_duel; the wandering displacement is binomial(steps, 2/3) moves, each one way or the other
+			gap = numpy.sqrt((pd['x'] - py['x'])**2 + (pd['y'] - py['y'])**2) - perception_radius
+			skip = numpy.floor(gap / SQRT2 - 1).astype(numpy.int64) // (pd['turns'] + py['turns'])
+			skip = numpy.minimum(numpy.maximum(skip, 0), 999 - round_counter)
+			round_counter += skip
+			if metrics is not None:
+				skipped_rounds += skip
+				for side in sides:
+					side['steps'] += skip * side['turns']
+			for side in sides:
+				for axis in ('x', 'y'):
+					moving = rng.binomial(skip * side['turns'], 2.0/3)
+					side[axis] += 2 * rng.binomial(moving, 0.5) - moving
+
+		round_counter += 1
+		#0 while a duel is still going, 1 if the predator won it this round, 2 if the prey did
+		outcome = numpy.zeros(len(duel), dtype=numpy.int8)
+
+		for actor, other, actor_is_predator in ((pd, py, True), (py, pd, False)):
+			for x in range(0, int(actor['turns'].max())):
+				idx = numpy.nonzero((outcome == 0) & (actor['turns'] > x))[0]
+				if not len(idx):
+					break
+				predator_kills, prey_kills = _vectorized_turn(actor, other, idx, actor_is_predator, rng)
+				outcome[predator_kills] = 1
+				outcome[prey_kills] = 2
+
+		#after 1000 rounds if both are alive, the prey escapes and the predator starves
+		starved = (outcome == 0) & (round_counter >= 1000)
+		outcome[starved] = 2
+
+		done = outcome != 0
+		if done.any():
+			finished = duel[done]
+			predator_won[finished] = outcome[done] == 1
+			final_predator_fortitude[finished] = pd['fortitude'][done]
+			final_prey_fortitude[finished] = py['fortitude'][done]
+			if metrics is not None:
+				counts['rounds'][finished] = round_counter[done]
+				counts['skipped_rounds'][finished] = skipped_rounds[done]
+				counts['starved'][finished] = starved[done]
+				for field in Metrics.turn_fields:
+					counts[field][finished] = pd[field][done] + py[field][done]
+
+			keep = ~done
+			duel = duel[keep]
+			round_counter = round_counter[keep]
+			perception_radius = perception_radius[keep]
+			if metrics is not None:
+				skipped_rounds = skipped_rounds[keep]
+			for side in sides:
+				for key in side:
+					side[key] = side[key][keep]
+
+	if metrics is not None:
+		metrics.record_duels(counts)
+	return predator_won, final_predator_fortitude, final_prey_fortitude
+
+
+def _vectorized_turn(actor, other, idx, actor_is_predator, rng):
+	"""
+	take_combat_turn for every row in idx at once. actor and other are the column dicts from run_vectorized_duels; if 
+	they carry Metrics.turn_fields columns, the actor's turns are counted in them.
+	Returns two index arrays: rows where the predator just killed the prey, and rows where the prey just killed the predator
+	"""
+	no_kills = numpy.zeros(0, dtype=numpy.int64)
+	same = (actor['x'][idx] == other['x'][idx]) & (actor['y'][idx] == other['y'][idx])
+
+	#locked in combat; 1d20 willpower checks decide whether the organism taking the turn gets away
+	locked = idx[same]
+	counted = 'steps' in actor
+	predator_kills = prey_kills = no_kills
+	if len(locked):
+		if counted:
+			actor['engagements'][locked] += 1
+		actor_roll = actor['willpower'][locked] + rng.randint(1, 21, len(locked))
+		other_roll = other['willpower'][locked] + rng.randint(1, 21, len(locked))
+		if actor_is_predator:
+			#forced off; how far depends on the predator's current fortitude
+			escape = actor_roll < other_roll
+			reach = (actor['fortitude'][locked[escape]] * 0.1).astype(numpy.int64) + 1
+		else:
+			#ran away!
+			escape = actor_roll > other_roll
+			reach = (actor['speed'][locked[escape]] * 0.1).astype(numpy.int64) + 1
+
+		escaped = locked[escape]
+		if counted:
+			actor['escapes'][escaped] += 1
+		if len(escaped):
+			#1d(reach) per axis; randint won't take an array of upper bounds on older numpy
+			actor['x'][escaped] += (rng.random_sample(len(escaped)) * reach).astype(numpy.int64) + 1
+			actor['y'][escaped] += (rng.random_sample(len(escaped)) * reach).astype(numpy.int64) + 1
+
+		#no escape; predator strikes prey, and only the predator gets to crit
+		struck = locked[~escape]
+		if len(struck):
+			if actor_is_predator:
+				predator, prey = actor, other
+			else:
+				predator, prey = other, actor
+
+			damage = rng.randint(1, 6, len(struck)) + (predator['power'][struck] * 0.05).astype(numpy.int64)
+			if actor_is_predator:
+				damage[rng.randint(0, 20, len(struck)) == 0] *= 2
+			prey['fortitude'][struck] -= damage
+			prey_dead = prey['fortitude'][struck] <= 0
+			predator_kills = struck[prey_dead]
+
+			#prey strikes back
+			struck = struck[~prey_dead]
+			revenge = rng.randint(1, 6, len(struck)) + (prey['power'][struck] * 0.05).astype(numpy.int64)
+			predator['fortitude'][struck] -= revenge
+			prey_kills = struck[predator['fortitude'][struck] <= 0]
+
+	#not in the same spot; sense the other organism and step
+	moving = idx[~same]
+	if len(moving):
+		dx = other['x'][moving] - actor['x'][moving]
+		dy = other['y'][moving] - actor['y'][moving]
+		in_range = dx*dx + dy*dy <= (actor['perception'][moving] * 0.50)**2
+
+		#1d20 perception check against the other organism's 1d20 stealth check, only for those in range
+		sensed = numpy.zeros(len(moving), dtype=bool)
+		checking = numpy.nonzero(in_range)[0]
+		if len(checking):
+			perception_roll = actor['perception'][moving[checking]] + rng.randint(1, 21, len(checking))
+			stealth_roll = other['stealth'][moving[checking]] + rng.randint(1, 21, len(checking))
+			sensed[checking] = perception_roll > stealth_roll
+		if counted:
+			actor['sense_checks'][moving] += 1
+			actor['steps'][moving] += 1
+			actor['senses'][moving] += sensed
+
+		wander_x = rng.randint(-1, 2, len(moving))
+		wander_y = rng.randint(-1, 2, len(moving))
+		if actor_is_predator:
+			step_x = numpy.where(sensed, numpy.sign(dx), wander_x)
+			step_y = numpy.where(sensed, numpy.sign(dy), wander_y)
+		else:
+			#retreat directly away; panic and maybe go diagonally along an axis we share
+			step_x = numpy.where(sensed & (dx != 0), -numpy.sign(dx), wander_x)
+			step_y = numpy.where(sensed & (dy != 0), -numpy.sign(dy), wander_y)
+		actor['x'][moving] += step_x
+		actor['y'][moving] += step_y
+
+	return predator_kills, prey_kills
+
+
+
+class Metrics(object):
+	"""
+	Opt-in instrumentation for one Generation: wall time per phase of simulate_generation and reproduce (timers, in 
+	seconds), and counts from every duel. For each of duel_fields there is a total over all the duels and a
+	distribution, {value: number of duels}:
+
+		rounds          rounds the duel lasted, fast-forwarded ones included
+		skipped_rounds  rounds fast-forwarded over
+		steps           steps taken by both organisms, fast-forwarded wandering included
+		sense_checks    sense_other calls
+		senses          sense_other calls that succeeded
+		engagements     turns begun locked in combat
+		escapes         of those, turns that ended with the prey running away or the predator forced off
+		starved         1 if the duel hit the 1000 round cutoff
+
+	Nothing is timed or counted unless a Metrics is handed in, so runs without one pay nothing for it.
+	"""
+
+	duel_fields = ('rounds', 'skipped_rounds', 'steps', 'sense_checks', 'senses', 'engagements', 'escapes', 'starved')
+	#the fields counted turn by turn, as opposed to once per duel
+	turn_fields = ('steps', 'sense_checks', 'senses', 'engagements', 'escapes')
+
+	def __init__(self):
+		self.timers = {}
+		self.duels = 0
+		self.totals = dict((field, 0) for field in Metrics.duel_fields)
+		self.distributions = dict((field, {}) for field in Metrics.duel_fields)
+
+	@staticmethod
+	def new_tally():
+		#a blank per-duel tally for run_duel
+		return dict((field, 0) for field in Metrics.duel_fields)
+
+	@contextlib.contextmanager
+	def timer(self, phase):
+		#adds the wall time spent in the with block to timers[phase]
+		started = time.time()
+		try:
+			yield
+		finally:
+			self.timers[phase] = self.timers.get(phase, 0) + time.time() - started
+
+	def record_duel(self, tally):
+		self.duels += 1
+		for field in Metrics.duel_fields:
+			value = tally[field]
+			self.totals[field] += value
+			distribution = self.distributions[field]
+			distribution[value] = distribution.get(value, 0) + 1
+
+	def record_duels(self, counts):
+		#the same for many duels at once; counts holds an equal-length numpy column per field
+		self.duels += len(counts['rounds'])
+		for field in Metrics.duel_fields:
+			self.totals[field] += int(counts[field].sum())
+			distribution = self.distributions[field]
+			values, frequencies = numpy.unique(counts[field], return_counts=True)
+			for value, frequency in zip(values.tolist(), frequencies.tolist()):
+				distribution[value] = distribution.get(value, 0) + frequency
+
+	def mean(self, field):
+		#average of field per duel
+		if not self.duels:
+			return 0.0
+		return self.totals[field] / float(self.duels)
+
+	def as_dict(self):
+		#plain, JSON-friendly copy
+		return {
+			'timers': dict(self.timers),
+			'duels': self.duels,
+			'totals': dict(self.totals),
+			'distributions': dict((field, dict((str(value), count) for value, count in distribution.items()))
+				for field, distribution in self.distributions.items()),
+		}
+
+
+@contextlib.contextmanager
+def _untimed(phase):
+	#stands in for Metrics.timer when there is nothing to record to
+	yield
+
+
+
+class RunningStats(object):
+	"""
+	Running statistics for one integer stat over a changing group of organisms: count, sum and sum of squares, plus
+	how many organisms have each value. Organisms can be added and taken away again in O(1), and the mean, variance, 
+	min, max and histograms are read off without going back over the organisms: the extremes and the bins of every
+	histogram width asked for so far are kept up to date as organisms come and go. Only taking away the last organism
+	with the min or max value costs a look over the distinct values, for the new one. Everything is kept in integers, so 
+	nothing drifts however many organisms come and go.
+	"""
+
+	def __init__(self, values=()):
+		self.count = 0
+		self.total = 0
+		self.total_sq = 0
+		#value -> number of organisms with it
+		self.counts = {}
+		#the current extremes; only rescanned for when the last organism with one of them is taken away
+		self.low = self.high = None
+		#bin width -> {bin start: count}, for every width a histogram has been asked for; kept up to date from then on
+		self.bins = {}
+		for value in values:
+			self.add(value)
+
+	def add(self, value):
+		self.count += 1
+		self.total += value
+		self.total_sq += value * value
+		self.counts[value] = self.counts.get(value, 0) + 1
+		if self.low is None or value < self.low:
+			self.low = value
+		if self.high is None or value > self.high:
+			self.high = value
+		for width, bins in self.bins.items():
+			start = value // width * width
+			bins[start] = bins.get(start, 0) + 1
+
+	def remove(self, value):
+		self.count -= 1
+		self.total -= value
+		self.total_sq -= value * value
+		if self.counts[value] == 1:
+			del self.counts[value]
+			if value == self.low:
+				self.low = min(self.counts) if self.counts else None
+			if value == self.high:
+				self.high = max(self.counts) if self.counts else None
+		else:
+			self.counts[value] -= 1
+		for width, bins in self.bins.items():
+			start = value // width * width
+			if bins[start] == 1:
+				del bins[start]
+			else:
+				bins[start] -= 1
+
+	def mean(self):
+		return self.total / float(self.count) if self.count else None
+
+	def int_mean(self):
+		#the floored mean the reports have always shown
+		return self.total // self.count if self.count else None
+
+	def variance(self):
+		#population variance
+		if not self.count:
+			return None
+		return (self.total_sq - self.total * self.total / float(self.count)) / self.count
+
+	def min(self):
+		return self.low
+
+	def max(self):
+		return self.high
+
+	def histogram(self, width=10):
+		#fixed-width bins as a sorted list of (bin start, count); bins start at multiples of width. The first call for a
+		#width counts the bins up from the distinct values, and add/remove keep them from then on
+		if width not in self.bins:
+			bins = {}
+			for value, count in self.counts.items():
+				start = value // width * width
+				bins[start] = bins.get(start, 0) + count
+			self.bins[width] = bins
+		return sorted(self.bins[width].items())
+
+	def spread(self):
+		#mean, variance, min and max as a plain dict
+		return {'mean': self.mean(), 'variance': self.variance(), 'min': self.min(), 'max': self.max()}
+
+	def getstate(self):
+		#everything, as a JSON-friendly list; see setstate
+		return [self.count, self.total, self.total_sq, sorted(self.counts.items())]
+
+	def setstate(self, state):
+		self.count, self.total, self.total_sq, counts = state
+		self.counts = dict((value, count) for value, count in counts)
+		self.low = min(self.counts) if self.counts else None
+		self.high = max(self.counts) if self.counts else None
+		self.bins = {}
+
+
+
+class SpatialHash(object):
+	"""
+	Buckets points on the combat grid into square cells of cell_size, so that everything within some radius of a point
+	can be found by looking through the few cells around it instead of at every point. Keys are whatever the caller
+	uses to tell its points apart.
+	"""
+
+	def __init__(self, cell_size):
+		self.cell_size = cell_size
+		#(cell x, cell y) -> set of keys
+		self.cells = {}
+
+	def cell(self, location):
+		return (location[0] // self.cell_size, location[1] // self.cell_size)
+
+	def insert(self, key, location):
+		cell = self.cell(location)
+		bucket = self.cells.get(cell)
+		if bucket is None:
+			self.cells[cell] = bucket = set()
+		bucket.add(key)
+
+	def remove(self, key, location):
+		cell = self.cell(location)
+		bucket = self.cells[cell]
+		bucket.discard(key)
+		if not bucket:
+			del self.cells[cell]
+
+	def move(self, key, old_location, new_location):
+		if self.cell(old_location) != self.cell(new_location):
+			self.remove(key, old_location)
+			self.insert(key, new_location)
+
+	def near(self, location, radius):
+		#keys in every cell the square of half-width radius around location touches; a superset of those within radius
+		size = self.cell_size
+		low_x, high_x = int(location[0] - radius) // size, int(location[0] + radius) // size
+		low_y, high_y = int(location[1] - radius) // size, int(location[1] + radius) // size
+		cells = self.cells
+		for cx in range(low_x, high_x + 1):
+			for cy in range(low_y, high_y + 1):
+				bucket = cells.get((cx, cy))
+				if bucket:
+					for key in bucket:
+						yield key
+
+
+
+class SharedWorld(object):
+	"""
+	A whole generation let loose on one grid at once, instead of one pairing at a time. Every round each hungry 
+	predator, then each prey, takes its turns against the nearest organism of the other side within its perception
+	radius, by the usual take_combat_turn rules: sense it and give chase (or run), fight when on the same spot, and
+	wander when nobody is in range. Who is within range is looked up in a SpatialHash per side.
+
+	A predator that kills a prey has eaten and leaves the grid. A prey that kills a predator carries on. Predators 
+	still hungry when the rounds run out starve, as they would at the end of a duel.
+
+	organisms are duel stand-ins (see Organism.from_combat_record) and locations their (x, y) starting points; both
+	are indexed by the caller's own keys 0..n-1.
+	"""
+
+	def __init__(self, organisms, locations, rng=dice):
+		self.organisms = organisms
+		self.locations = list(locations)
+		self.rng = as_dice(rng)
+		#keys of the organisms that have been locked in combat at least once
+		self.engaged = set()
+		self.fed = set()
+		self.dead = set()
+
+		for organism in organisms:
+			organism.prepare_for_combat()
+		#no organism can sense farther than the largest perception radius; that makes a good bucket size
+		reach = max([organism.perception * 0.50 for organism in organisms] + [1])
+		self.hashes = {True: SpatialHash(int(reach) + 1), False: SpatialHash(int(reach) + 1)}
+		for key, organism in enumerate(organisms):
+			self.hashes[organism.predator].insert(key, self.locations[key])
+
+	def nearest_enemy(self, key):
+		#key of the closest organism of the other side within key's perception radius, or None
+		organism = self.organisms[key]
+		x, y = self.locations[key]
+		best = None
+		for other in self.hashes[not organism.predator].near((x, y), organism.perception * 0.50):
+			ox, oy = self.locations[other]
+			distance_sq = (ox - x) * (ox - x) + (oy - y) * (oy - y)
+			if 4 * distance_sq <= organism.perception_sq and (best is None or (distance_sq, other) < best):
+				best = (distance_sq, other)
+		return best[1] if best is not None else None
+
+	def take_turns(self, key):
+		#plays out one organism's turns for a round; stops early if it dies or eats
+		organism = self.organisms[key]
+		for turn in range(0, organism.turns):
+			location = self.locations[key]
+			other_key = self.nearest_enemy(key)
+			if other_key is None:
+				outcome = organism.step(location, rng=self.rng)
+			else:
+				other_location = self.locations[other_key]
+				if location == other_location:
+					self.engaged.update((key, other_key))
+				outcome = organism.take_combat_turn(self.organisms[other_key], location, other_location, self.rng)
+
+			if isinstance(outcome, tuple):
+				self.hashes[organism.predator].move(key, location, outcome)
+				self.locations[key] = outcome
+				continue
+
+			#somebody died
+			loser_key = other_key if outcome is organism else key
+			self.leave(loser_key)
+			self.dead.add(loser_key)
+			if not self.organisms[loser_key].predator and outcome.predator:
+				#the predator has eaten
+				winner_key = key if outcome is organism else other_key
+				self.leave(winner_key)
+				self.fed.add(winner_key)
+			return
+
+	def leave(self, key):
+		self.hashes[self.organisms[key].predator].remove(key, self.locations[key])
+
+	def run(self, rounds=1000):
+		"""
+		Plays up to rounds rounds, or until no hungry predators or no prey are left. Returns the keys of the survivors:
+		fed predators and living prey. Everyone else is dead, the starved included (they are added to self.dead).
+		"""
+		predators = [key for key, organism in enumerate(self.organisms) if organism.predator]
+		prey = [key for key, organism in enumerate(self.organisms) if not organism.predator]
+		for round_counter in range(0, rounds):
+			for side in (predators, prey):
+				for key in side:
+					if key not in self.dead and key not in self.fed:
+						self.take_turns(key)
+			predators = [key for key in predators if key not in self.dead and key not in self.fed]
+			prey = [key for key in prey if key not in self.dead]
+			if not predators or not prey:
+				break
+
+		#whoever is still hunting starves
+		for key in predators:
+			self.leave(key)
+			self.dead.add(key)
+		return [key for key in range(0, len(self.organisms)) if key not in self.dead]
+
+
+
 class Generation(object):
 	"""
 	A Generation is a population of Organisms. Generation 0 of the simulation will have no ancestors, so to create
-	that generation simply supply the starting population size. Otherwise, initialize with a list of Organism
-	objects (survivors of the previous generation, ancestors to the new one)
+	that generation simply supply the starting population size. Otherwise, initialize with the ancestors to the new one
+	(survivors of the previous generation), either as a Population or as a list of Organism objects, or hand over an
+	already-born population.
+
+	The organisms themselves live in self.population; predator_slots and prey_slots list the living members of each
+	side. self.predators and self.prey give the same organisms as Organism views. self.stats keeps RunningStats of the
+	living members of each side, {'predator': {stat: RunningStats}, 'prey': {...}}, up to date as organisms die.
 	"""
 
 	generation_counter = 0
 
+	#the stats kept as RunningStats for each side; see self.stats
+	tracked_stats = ('speed', 'willpower', 'power', 'fortitude', 'stealth', 'perception', 'virility', 'hunger')
+
+	#the counters that make it into summary()
+	summary_counters = ('initial_predator_count', 'initial_prey_count', 'initial_total_count', 'nonviable_predator_count',
+		'nonviable_prey_count', 'post_combat_predator_count', 'post_combat_prey_count', 'post_combat_total_count',
+		'post_combat_population_imbalance', 'predator_hunger_death_count', 'prey_hunger_death_count',
+		'final_predator_count', 'final_prey_count', 'final_total_count')
+
 
 	def __init__(self, **kwargs):
 
@@ -323,89 +1871,110 @@ class Generation(object):
 		self.id = Generation.generation_counter
 		Generation.generation_counter += 1
 
-		if kwargs.get('n', None) is not None:
-			#if n is supplied we are spawning generation 0. initalize n organisms. 
-			self.predators = []
-			self.prey = []
+		#every organism born into this generation, viable or not, gets a row here
+		self.population = Population()
+		#a LineageStore to record the newborns in, and pass on to the next generation; see reproduce
+		self.lineage = kwargs.get('lineage', None)
+		parent_a = parent_b = None
+		#offspring that were never born because their side was over capacity; see reproduce
+		self.culled_predator_count = 0
+		self.culled_prey_count = 0
+
+		if kwargs.get('population', None) is not None:
+			#the generation has already been born; e.g. it was restored from a checkpoint
+			self.population = kwargs['population']
+
+		elif kwargs.get('n', None) is not None:
+			#if n is supplied we are spawning generation 0. initalize n organisms, on dice seeded from the random module
+			rng = BufferedRandom(random.getrandbits(64))
 			for i in range(0,kwargs['n']):
-				new_organism = Organism()
-				if not new_organism.viable:
-					#organism died in utero, does not make it to surviving population
-					if new_organism.predator:
-						self.nonviable_predator_count += 1
-					else:
-						self.nonviable_prey_count += 1
-				elif new_organism.predator:
-					self.predators.append(new_organism)
-				else:
-					self.prey.append(new_organism)
+				self.population.spawn(rng)
+			if self.lineage is not None:
+				self.lineage.record(self.id, self.population)
 
 		else:
-			#If we don't get an n object, we're getting a list of Organisms from the previous generation called Ancestors
+			#If we don't get an n object, we're getting the Organisms from the previous generation called Ancestors
 			#These are the ones that survived. We use their genetics to initialize the next generation.
-			self.predators = []
-			self.prey = []
-
-			#each Organism will mate with between 0 and 3 other Organisms, controlled by the Virility stat. 
-			#Use python's weirdo division/int/whatever to get the numbers we actually want here
-
-			#Iterate through ancestors; for each, determine # of mates
-			for a in kwargs['ancestors']:
-				mate_counter = a.virility/12
-
-				#get random mates by sampling an appropriate number from the list of potential mates
-				try:
-					if a.predator:
-						mates = random.sample([m for m in kwargs['ancestors'] if m.predator and m != a], mate_counter)
-					else:
-						mates = random.sample([m for m in kwargs['ancestors'] if not m.predator and m != a], mate_counter)
-				except ValueError:
-					#if the mate_counter for a given ancestor exceeds the available pool of mates, 
-					#we get ValueError("sample larger than population"). In this scenario, we say the ancestor
-					#doesn't get to mate AT ALL, simulating a sort of population collapse
-					mates = []
-
-				#now our current Organism will pair with its mates, creating a new Organism
-				for m in mates:
-					#Create a dictionary of tuples, representing each parent's contribution to the pairing
-					parent_dict = {
-						'Speed': (a.speed, m.speed),
-						'Willpower': (a.speed, m.speed),
-						'Power': (a.power, m.power),
-						'Stealth': (a.stealth, m.stealth),
-						'Virility': (a.virility, m.virility),
-						'Fortitude': (a.fortitude, m.fortitude),
-						'Perception': (a.perception, m.perception),
-						'Predator': a.predator,
-						'id': (a.id, m.id)
-					}
-
-					#Create a new Organism by passing this dict of tuples; remember, they get sorted in the Organism's init
-					offspring = Organism(parent_dict=parent_dict)
-
-					#Append viable offspring to self.predator/prey, update counters for nonviables
-					if offspring.viable:
-						if offspring.predator:
-							self.predators.append(offspring)
-						else:
-							self.prey.append(offspring)
-					else:
-						if offspring.predator:
-							self.nonviable_predator_count += 1
-						else:
-							self.nonviable_prey_count += 1
+			ancestors = kwargs['ancestors']
+			if not isinstance(ancestors, Population):
+				ancestors = Population.from_organisms(ancestors)
+
+			if kwargs.get('capacity', None) is not None:
+				if not kwargs.get('batched', True):
+					raise ValueError("A capacity only works with batched breeding")
+				a_slots, m_slots, culled = sample_matings(ancestors, iter_matings(ancestors), kwargs['capacity'])
+				self.culled_prey_count, self.culled_predator_count = culled
+				self.population.breed_batch(ancestors, a_slots, m_slots)
+				if self.lineage is not None:
+					parent_a = [ancestors.id[a] for a in a_slots]
+					parent_b = [ancestors.id[m] for m in m_slots]
+
+			elif kwargs.get('batched', True):
+				a_slots, m_slots = choose_mates(ancestors)
+				self.population.breed_batch(ancestors, a_slots, m_slots)
+				if self.lineage is not None:
+					parent_a = [ancestors.id[a] for a in a_slots]
+					parent_b = [ancestors.id[m] for m in m_slots]
 
+			else:
+				parent_a, parent_b = [], []
+				#the original one ancestor at a time breeding; kept as the reference for choose_mates/breed_batch
+				#each Organism will mate with between 0 and 3 other Organisms, controlled by the Virility stat. 
+				#Use python's weirdo division/int/whatever to get the numbers we actually want here
+
+				#Iterate through ancestors; for each, determine # of mates
+				for a in range(0, len(ancestors)):
+					mate_counter = ancestors.virility[a]//12
+
+					#get random mates by sampling an appropriate number from the slots of potential mates
+					try:
+						if ancestors.predator[a]:
+							mates = random.sample([m for m in range(0, len(ancestors)) if ancestors.predator[m] and m != a], mate_counter)
+						else:
+							mates = random.sample([m for m in range(0, len(ancestors)) if not ancestors.predator[m] and m != a], mate_counter)
+					except ValueError:
+						#if the mate_counter for a given ancestor exceeds the available pool of mates, 
+						#we get ValueError("sample larger than population"). In this scenario, we say the ancestor
+						#doesn't get to mate AT ALL, simulating a sort of population collapse
+						mates = []
+
+					#now our current Organism will pair with its mates, creating a new Organism
+					for m in mates:
+						self.population.breed(ancestors, a, m)
+						parent_a.append(ancestors.id[a])
+						parent_b.append(ancestors.id[m])
+
+			if self.lineage is not None:
+				self.lineage.record(self.id, self.population, parent_a, parent_b)
+
+		#sort the newborns into their sides, in birth order, and update counters for nonviables
+		self.predator_slots = array.array(Population.typecode)
+		self.prey_slots = array.array(Population.typecode)
+		for slot in range(0, len(self.population)):
+			if not self.population.viable[slot]:
+				#organism died in utero, does not make it to surviving population
+				if self.population.predator[slot]:
+					self.nonviable_predator_count += 1
+				else:
+					self.nonviable_prey_count += 1
+			elif self.population.predator[slot]:
+				self.predator_slots.append(slot)
+			else:
+				self.prey_slots.append(slot)
 
+		self.stats = {}
+		for side, slots in (('predator', self.predator_slots), ('prey', self.prey_slots)):
+			self.stats[side] = dict((attr, RunningStats(getattr(self.population, attr)[slot] for slot in slots))
+				for attr in Generation.tracked_stats)
 
-
-		self.initial_predator_count = len(self.predators)
-		self.initial_prey_count = len(self.prey)
-		self.initial_total_count = self.initial_predator_count + self.initial_prey_count
+		self.count_initial()
 
 		self.nonviable_count = self.nonviable_prey_count + self.nonviable_predator_count
 
 		#flag is set to False until we run the trials on a given generation
 		self.simulation_has_run = False
+		#a Metrics, if simulate_generation was asked to record one
+		self.metrics = None
 		
 		#we update these counters after the simulation has run
 		self.post_combat_predator_count = 0
@@ -421,96 +1990,287 @@ class Generation(object):
 		self.final_total_count = 0
 
 
+	@property
+	def predators(self):
+		#the living predators, as Organism views
+		return [self.population.organism(slot) for slot in self.predator_slots]
+
+	@property
+	def prey(self):
+		#the living prey, as Organism views
+		return [self.population.organism(slot) for slot in self.prey_slots]
+
 
 	def generate_trial_pairings(self):
 		#determines combat pairings & leftovers for the generation
-		#recall that self.predators/self.prey are lists of objects (Organisms)
+		#pairings are (predator slot, prey slot) tuples and leftovers a list of slots, all in self.population
 
 		#the population (predator or prey) with the smaller size is our "limiting reagent" - they'll all get matches
 		if self.initial_predator_count > self.initial_prey_count:
-			prey_list = self.prey
-			shuffled_predators = [s for s in random.sample(self.predators, len(self.predators))]
+			prey_list = list(self.prey_slots)
+			shuffled_predators = random.sample(list(self.predator_slots), len(self.predator_slots))
 			#we split this shuffled list into two parts; the first slice will be our "matchups"
 			predator_list = shuffled_predators[:self.initial_prey_count]
 			leftovers = shuffled_predators[self.initial_prey_count:]
 			leftover_type = "Predator"
 
 		else:
-			predator_list = self.predators
-			shuffled_prey = [s for s in random.sample(self.prey, len(self.prey))]
+			predator_list = list(self.predator_slots)
+			shuffled_prey = random.sample(list(self.prey_slots), len(self.prey_slots))
 			prey_list = shuffled_prey[:self.initial_predator_count]
 			leftovers = shuffled_prey[self.initial_predator_count:]
 			leftover_type = "Prey"
 
 
 		#at this point both predator_list and prey_list are of equal length
-		pairings = zip(predator_list, prey_list)
+		pairings = list(zip(predator_list, prey_list))
 
 		return {'pairings': pairings, 'leftovers': leftovers, 'leftover_type': leftover_type}
 
 
 
-	def run_combat_trials(self, pairings, leftovers):
-		#iterates through pairings and returns a list of victorious Organism objects
-		#recall that pairings comes in as a list of tuples
+	def run_combat_trials(self, pairings, leftovers, seed=None, fast_forward=True, metrics=None, outcome_table=None,
+			recorder=None):
+		"""
+		Iterates through pairings and returns a list of the slots of the survivors. Recall that pairings comes in as a
+		list of (predator slot, prey slot) tuples.
+
+		Without a seed, the duels roll one BufferedRandom seeded from the random module. With a seed, each pairing gets
+		its own BufferedRandom derived from the seed and its position in pairings (see pairing_seed), which is what lets
+		run_parallel_combat_trials reproduce this method exactly. fast_forward is passed on to run_duel. Every duel is 
+		counted into metrics, if given.
+
+		With an OutcomeTable, duels it can settle are decided by a draw against it instead of being played out; both
+		keep their fortitude from before the duel and the winner's is reset as usual. The rest are played and learned 
+		from. Only duels that are played out are counted into metrics.
 
+		With a DuelRecorder, the duels it samples are recorded turn by turn.
+		"""
 		survivors = []
 		survivors += leftovers
 		#we seed the survivor list here with our leftovers, even though they're not in combat. This lets
 		#us use some easy list comprehension later to reconstruct the total population after combat has taken place,
 		#and lets us accurately calculate imbalance after combat
 
+		if seed is None:
+			#all the duels roll on one set of dice, seeded from the random module
+			rng = BufferedRandom(random.getrandbits(64))
+		for i, (predator_slot, prey_slot) in enumerate(pairings):
+			if seed is not None:
+				rng = BufferedRandom(pairing_seed(seed, i))
+			if outcome_table is not None:
+				predator_record = self.population.combat_record(predator_slot)
+				prey_record = self.population.combat_record(prey_slot)
+				key = outcome_table.key(predator_record, prey_record)
+				predator_won = outcome_table.resolve(key, rng)
+				if predator_won is not None:
+					survivors.append(self.settle_duel(predator_slot, prey_slot, predator_won,
+						self.population.fortitude[predator_slot], self.population.fortitude[prey_slot]))
+					continue
+			#the duel is fought by plain stand-ins, which are much quicker to work with than views over the columns
+			if recorder is not None and recorder.sampled():
+				tally = Metrics.new_tally()
+				predator_record = self.population.combat_record(predator_slot)
+				prey_record = self.population.combat_record(prey_slot)
+				recorder.begin_duel(self.id, i, predator_record, prey_record)
+				player_one = RecordingOrganism.from_combat_record(predator_record, tally, recorder)
+				player_two = RecordingOrganism.from_combat_record(prey_record, tally, recorder)
+				victor = run_duel(player_one, player_two, rng, fast_forward, tally, recorder)
+				recorder.end_duel(victor is player_one)
+				if metrics is not None:
+					metrics.record_duel(tally)
+			elif metrics is None:
+				player_one = Organism.from_combat_record(self.population.combat_record(predator_slot))
+				player_two = Organism.from_combat_record(self.population.combat_record(prey_slot))
+				victor = run_duel(player_one, player_two, rng, fast_forward)
+			else:
+				tally = Metrics.new_tally()
+				player_one = CountingOrganism.from_combat_record(self.population.combat_record(predator_slot), tally)
+				player_two = CountingOrganism.from_combat_record(self.population.combat_record(prey_slot), tally)
+				victor = run_duel(player_one, player_two, rng, fast_forward, tally)
+				metrics.record_duel(tally)
+			if outcome_table is not None:
+				outcome_table.observe(key, victor is player_one)
+			survivors.append(self.settle_duel(predator_slot, prey_slot, victor is player_one,
+				player_one.fortitude, player_two.fortitude))
 
-		for player_one, player_two in pairings:
-			round_counter = 0
-			#drop the participants on a grid
-			player_one_location = ( random.randrange(-10,11), random.randrange(-10,11) )
-			player_two_location = ( random.randrange(-10,11), random.randrange(-10,11) )
+		return self.reconcile_survivors(survivors)
 
-			while (player_one.alive and player_two.alive):
-				#take_combat_turn(self, other, self_location, other_location) returns either a new location for the entity
-				#taking the turn or a victorious organism
 
-				#each player takes a certain number of turns per cycle, determined by their Speed stat
-				round_counter += 1
+	def run_parallel_combat_trials(self, pairings, leftovers, workers, seed, fast_forward=True, metrics=None, pool=None):
+		"""
+		run_combat_trials spread over a pool of worker processes. Pairings are shipped out in chunks as plain stat records
+		(see Organism.combat_record) and only the outcomes come back: the winner's id and both final fortitudes.
+		Every pairing plays on its own random stream derived from seed, so the result is the same whatever the number of
+		workers, and the same as run_combat_trials(pairings, leftovers, seed=seed, fast_forward=fast_forward). With metrics,
+		the workers send back each duel's tally as well.
+
+		pool, if given, is a multiprocessing.Pool of workers processes to play on, and is left running for the next
+		generation (an Epoch keeps one for the whole run). Without one, a pool is started for these duels alone.
+		"""
+		survivors = []
+		survivors += leftovers
 
-				for x in range(0, (int( player_one.speed * .15 )+1) ):
-					player_one_location = player_one.take_combat_turn(player_two, player_one_location, player_two_location)
-					if player_one_location == player_one or player_one_location == player_two:
-						victorious_organism = player_one_location.reset_fort() #victorious object; not necessarily player one!
-						survivors.append(victorious_organism)
-						break
+		records = [(self.population.combat_record(predator_slot), self.population.combat_record(prey_slot))
+			for predator_slot, prey_slot in pairings]
+		#a few chunks per worker so that a chunk full of 1000-round stalemates doesn't hold up the whole pool
+		chunk_size = max(1, int(math.ceil(len(records) / float(workers * 4))))
+		chunks = [(seed, start, records[start:start+chunk_size], fast_forward, metrics is not None)
+			for start in range(0, len(records), chunk_size)]
 
-				if not (player_one.alive and player_two.alive):
-					break
+		if pool is not None:
+			results = pool.map(run_duel_chunk, chunks)
+		else:
+			pool = multiprocessing.Pool(workers)
+			try:
+				results = pool.map(run_duel_chunk, chunks)
+			finally:
+				pool.terminate()
+				pool.join()
 
-				for x in range(0, (int( player_two.speed * .15)+1) ):
-					player_two_location = player_two.take_combat_turn(player_one, player_two_location, player_one_location)
-					if player_two_location == player_one or player_two_location == player_two:
-						victorious_organism = player_two_location.reset_fort() #victorious object; not necessarily player two!
-						survivors.append(victorious_organism)
-						break
-				
-				if not (player_one.alive and player_two.alive):
-					break	
-					
-			
-				if round_counter >= 1000:
-					#after 1000 rounds if both are alive, the prey escapes and the predator starves
-					if player_one.predator:
-						player_one.alive = False
-						survivors.append(player_two.reset_fort())
-					else:
-						player_two.alive = False
-						survivors.append(player_one.reset_fort())
-					
+		outcomes = [outcome for chunk in results for outcome in chunk]
+		for (predator_slot, prey_slot), (winner_id, predator_fortitude, prey_fortitude, tally) in zip(pairings, outcomes):
+			if metrics is not None:
+				metrics.record_duel(tally)
+			survivors.append(self.settle_duel(predator_slot, prey_slot, self.population.slot_of(winner_id) == predator_slot,
+				predator_fortitude, prey_fortitude))
 
+		return self.reconcile_survivors(survivors)
 
 
-		self.predators = [p for p in self.predators if p in survivors]
-		self.prey = [p for p in self.prey if p in survivors]
-		self.post_combat_predator_count = len(self.predators)
-		self.post_combat_prey_count = len(self.prey)
+	def run_vectorized_combat_trials(self, pairings, leftovers, seed=None, fast_forward=True, metrics=None):
+		"""
+		Same contract as run_combat_trials, but every pairing is played at once by run_vectorized_duels instead of one
+		duel at a time. Returns the survivor list (leftovers first, then one winner per pairing in pairing order).
+		"""
+		if numpy is None:
+			raise ImportError("The vectorized combat engine requires numpy")
+		survivors = []
+		survivors += leftovers
+
+		rng = None
+		if seed is not None:
+			rng = numpy.random.RandomState(seed % 2**32)
+		sides = []
+		for slots in ([predator_slot for predator_slot, prey_slot in pairings], [prey_slot for predator_slot, prey_slot in pairings]):
+			slots = numpy.array(slots, dtype=numpy.intp)
+			sides.append(dict((attr, self.population.numpy_column(attr)[slots])
+				for attr in ('speed', 'willpower', 'perception', 'stealth', 'fortitude', 'power')))
+		predator_won, predator_fortitude, prey_fortitude = run_vectorized_duels(sides[0], sides[1], rng, fast_forward, metrics)
+
+		for i, (predator_slot, prey_slot) in enumerate(pairings):
+			survivors.append(self.settle_duel(predator_slot, prey_slot, predator_won[i],
+				int(predator_fortitude[i]), int(prey_fortitude[i])))
+
+		return self.reconcile_survivors(survivors)
+
+
+	def run_world_trials(self, seed=None, rounds=1000, spacing=20):
+		"""
+		Combat for the whole generation at once on a SharedWorld, instead of in pairings. Everyone is dropped at random
+		on a square grid sized so that each organism has about spacing x spacing of room, and plays there for up to
+		rounds rounds. Returns (leftovers, leftover_type) for run_hunger_trials: the survivors on the bigger side who
+		were never locked in combat, the nearest thing this mode has to organisms that didn't get a match.
+		"""
+		rng = BufferedRandom(seed if seed is not None else random.getrandbits(64))
+		slots = list(self.predator_slots) + list(self.prey_slots)
+		organisms = [Organism.from_combat_record(self.population.combat_record(slot)) for slot in slots]
+		side = int(math.sqrt(len(slots)) * spacing) + 1
+		locations = [(rng.randrange(0, side), rng.randrange(0, side)) for slot in slots]
+
+		world = SharedWorld(organisms, locations, rng)
+		survivors = [slots[key] for key in world.run(rounds)]
+		for key in world.dead:
+			self.record_death(slots[key])
+			self.population.alive[slots[key]] = 0
+		for slot in survivors:
+			self.population.reset_fort(slot)
+		self.reconcile_survivors(survivors)
+
+		if self.initial_predator_count > self.initial_prey_count:
+			leftover_type = "Predator"
+		else:
+			leftover_type = "Prey"
+		leftovers = [slots[key] for key in range(0, len(slots)) if key not in world.dead and key not in world.engaged
+			and organisms[key].predator == (leftover_type == "Predator")]
+		return leftovers, leftover_type
+
+
+	def settle_duel(self, predator_slot, prey_slot, predator_won, predator_fortitude, prey_fortitude):
+		#writes the outcome of a duel back into the population: final fortitudes, the loser's death and the winner's
+		#fortitude reset. Returns the winner's slot
+		if predator_won:
+			winner, loser = predator_slot, prey_slot
+		else:
+			winner, loser = prey_slot, predator_slot
+		#the loser leaves the stats as it entered the duel; the winner's fortitude is back where it was by the end
+		self.record_death(loser)
+		self.population.fortitude[predator_slot] = predator_fortitude
+		self.population.fortitude[prey_slot] = prey_fortitude
+		self.population.alive[loser] = 0
+		self.population.reset_fort(winner)
+		return winner
+
+
+	def record_death(self, slot):
+		#takes a living organism out of self.stats
+		stats = self.stats['predator' if self.population.predator[slot] else 'prey']
+		for attr in Generation.tracked_stats:
+			stats[attr].remove(getattr(self.population, attr)[slot])
+
+
+	def emigrate(self, fraction):
+		"""
+		Takes a random fraction of each side's living organisms out of this generation before it is simulated, and 
+		returns them as a Population.pack_rows record. They are marked dead and the initial counts no longer include them.
+		"""
+		if self.simulation_has_run:
+			raise ValueError("Organisms can only leave a generation before it is simulated")
+		leaving = []
+		for side in ('predator_slots', 'prey_slots'):
+			slots = getattr(self, side)
+			chosen = set(random.sample(list(slots), int(len(slots) * fraction + 0.5)))
+			for slot in chosen:
+				self.record_death(slot)
+				self.population.alive[slot] = 0
+			setattr(self, side, array.array(Population.typecode, [slot for slot in slots if slot not in chosen]))
+			leaving.extend(sorted(chosen))
+		self.count_initial()
+		return self.population.pack_rows(leaving)
+
+	def admit(self, packed):
+		#adds the organisms in a Population.pack_rows record to this generation before it is simulated
+		if self.simulation_has_run:
+			raise ValueError("Organisms can only join a generation before it is simulated")
+		for slot in self.population.unpack_rows(packed):
+			if not self.population.viable[slot]:
+				continue
+			side = 'predator' if self.population.predator[slot] else 'prey'
+			getattr(self, side + '_slots').append(slot)
+			for attr in Generation.tracked_stats:
+				self.stats[side][attr].add(getattr(self.population, attr)[slot])
+		self.count_initial()
+
+	def count_initial(self):
+		self.initial_predator_count = len(self.predator_slots)
+		self.initial_prey_count = len(self.prey_slots)
+		self.initial_total_count = self.initial_predator_count + self.initial_prey_count
+
+	def collapsed(self):
+		#no predators or no prey left
+		return len(self.predator_slots) == 0 or len(self.prey_slots) == 0
+
+
+	def reconcile_survivors(self, survivors):
+		#rebuilds the populations from the survivors (slots) of combat and updates the post-combat counters
+		#survivors go into a slot-indexed bitmap first so each side is filtered in one linear pass
+		survived = bytearray(len(self.population))
+		for slot in survivors:
+			survived[slot] = 1
+		self.predator_slots = array.array(Population.typecode, [p for p in self.predator_slots if survived[p]])
+		self.prey_slots = array.array(Population.typecode, [p for p in self.prey_slots if survived[p]])
+		self.post_combat_predator_count = len(self.predator_slots)
+		self.post_combat_prey_count = len(self.prey_slots)
 		self.post_combat_total_count = self.post_combat_predator_count + self.post_combat_prey_count
 		
 		population_count_list = sorted((self.post_combat_prey_count, self.post_combat_predator_count))
@@ -524,9 +2284,10 @@ class Generation(object):
 
 		return survivors
 
-	def run_hunger_trials(self, leftovers, leftover_type):
+	def run_hunger_trials(self, leftovers, leftover_type, sink=None):
 		"""
-		to be used after combat trials; iterates through leftovers and sees who starves to death;
+		to be used after combat trials; iterates through leftovers (slots) and sees who starves to death;
+		progress goes to sink (a ConsoleSink if not given).
 
 		self.hunger means "I need the populations to be this percentage similar, or I am going to starve to death"
 		In other words, "I can maintain a maximum percentage imbalance of (100 - self.hunger)."
@@ -537,106 +2298,157 @@ class Generation(object):
 
 		So, if (100 - self.hunger) < imbalance, the organism starves.
 		"""
-		
-		print "{} {}s for Hunger Trials".format(len(leftovers), leftover_type)
-		print "Imbalance: {}".format(self.post_combat_population_imbalance)
-		
-		for o in leftovers:
-			if (100 - o.hunger) < self.post_combat_population_imbalance and leftover_type == 'Predator':
-				o.alive = False
-				self.predators.remove(o)
+		if sink is None:
+			sink = ConsoleSink()
+		sink.hunger_started(self, len(leftovers), leftover_type)
+
+		hunger = self.population.hunger
+		alive = self.population.alive
+		for slot in leftovers:
+			if (100 - hunger[slot]) < self.post_combat_population_imbalance and leftover_type == 'Predator':
+				self.record_death(slot)
+				alive[slot] = 0
 				self.predator_hunger_death_count += 1
 
-			elif (100 - o.hunger) < self.post_combat_population_imbalance and leftover_type == 'Prey':
-				o.alive = False
-				self.prey.remove(o)
+			elif (100 - hunger[slot]) < self.post_combat_population_imbalance and leftover_type == 'Prey':
+				self.record_death(slot)
+				alive[slot] = 0
 				self.prey_hunger_death_count += 1
 
+		#drop the starved from their side in a single pass over the alive flags
+		if leftover_type == 'Predator':
+			self.predator_slots = array.array(Population.typecode, [p for p in self.predator_slots if alive[p]])
+		else:
+			self.prey_slots = array.array(Population.typecode, [p for p in self.prey_slots if alive[p]])
+
 		return self
 
 	
-	def simulate_generation(self):
-		#Runs combat trials and hunger trials, returns self
-		print "Generating Pairing Dictionary for G{}".format(self.id)
-		pairing_dict = self.generate_trial_pairings()
-		print "...Done."
-
-		print "Running Combat Trials for G{}".format(self.id)
-		self.run_combat_trials(pairing_dict['pairings'], pairing_dict['leftovers'])
-		print "...Done."
-
-		print "Running Hunger Trials for G{}".format(self.id, len(pairing_dict['leftovers']))
-		self.run_hunger_trials(pairing_dict['leftovers'], pairing_dict['leftover_type'])
-		print "...Done."
-
-		self.final_predator_count = len(self.predators)
-		self.final_prey_count = len(self.prey)
+	def simulate_generation(self, engine='python', workers=1, seed=None, sink=None, metrics=None, outcome_table=None,
+			recorder=None, cache=None, pool=None):
+		"""
+		Runs combat trials and hunger trials, returns self.
+		engine picks how the duels are played: 'python' (run_combat_trials, one duel at a time) or 'numpy' 
+		(run_vectorized_combat_trials, every duel at once). With workers > 1 the python engine spreads the duels over
+		that many processes (run_parallel_combat_trials), on pool if one is given. 'world' skips the pairings altogether and lets the whole
+		generation fight it out on one grid (run_world_trials).
+		seed, if given, makes the duels reproducible; with the python engine every pairing plays on its own stream derived
+		from it, so the outcome is the same for any number of workers.
+		Progress and the closing report go to sink as events; see NullSink. Without one it all goes to the console.
+		Given a Metrics, the phases are timed and the duels counted into it; it is kept as self.metrics.
+		An OutcomeTable makes the python engine settle what duels it can from the table, and a DuelRecorder has it record
+		a sample of its duels (see run_combat_trials).
+		With a GenerationCache, the outcome is loaded from the cache if this exact generation has been simulated before
+		under the same rules, engine, seed and random state, and stored in it otherwise.
+		"""
+		if sink is None:
+			sink = ConsoleSink()
+		if engine not in ('python', 'numpy', 'world'):
+			raise ValueError("Unknown combat engine: {}".format(engine))
+		if engine != 'python' and workers > 1:
+			raise ValueError("The {} engine runs in a single process; use workers=1".format(engine))
+		if outcome_table is not None and (engine != 'python' or workers > 1):
+			raise ValueError("Outcome tables only work with the python engine on one worker")
+		if recorder is not None and (engine != 'python' or workers > 1):
+			raise ValueError("Duels can only be recorded with the python engine on one worker")
+		if cache is not None and (metrics is not None or outcome_table is not None or recorder is not None):
+			raise ValueError("A cached generation can't be instrumented, recorded or settled from an outcome table")
+		if cache is not None:
+			key = cache.key(self, engine, workers, seed)
+			if cache.load(key, self):
+				sink.cache_hit(self)
+				self.simulation_report(sink=sink)
+				return self
+		if workers > 1 and seed is None:
+			seed = random.getrandbits(64)
+		self.metrics = metrics
+		timer = metrics.timer if metrics is not None else _untimed
+
+		if engine != 'world':
+			sink.pairing_started(self)
+			with timer('pairing'):
+				pairing_dict = self.generate_trial_pairings()
+			sink.pairing_done(self)
+
+		sink.combat_started(self)
+		with timer('combat'):
+			if engine == 'world':
+				leftovers, leftover_type = self.run_world_trials(seed=seed)
+				pairing_dict = {'leftovers': leftovers, 'leftover_type': leftover_type}
+			elif engine == 'numpy':
+				self.run_vectorized_combat_trials(pairing_dict['pairings'], pairing_dict['leftovers'], seed=seed, metrics=metrics)
+			elif workers > 1:
+				self.run_parallel_combat_trials(pairing_dict['pairings'], pairing_dict['leftovers'], workers, seed, metrics=metrics,
+					pool=pool)
+			else:
+				self.run_combat_trials(pairing_dict['pairings'], pairing_dict['leftovers'], seed=seed, metrics=metrics,
+					outcome_table=outcome_table, recorder=recorder)
+		sink.combat_done(self)
+
+		with timer('hunger'):
+			self.run_hunger_trials(pairing_dict['leftovers'], pairing_dict['leftover_type'], sink=sink)
+		sink.hunger_done(self)
+
+		self.final_predator_count = len(self.predator_slots)
+		self.final_prey_count = len(self.prey_slots)
 		self.final_total_count = self.final_prey_count + self.final_predator_count
 
 		self.simulation_has_run = True
-		self.simulation_report()
+		with timer('report'):
+			self.simulation_report(sink=sink)
+		if cache is not None:
+			cache.store(key, self)
 		return self
 
 
-	def reproduce(self):
-		#Uses the current population to create the next generation
-		return Generation(ancestors=(self.predators + self.prey))
+	def reproduce(self, batched=True, capacity=None):
+		#Uses the current population to create the next generation; batched=False breeds the original, slower way
+		#with a capacity, at most that many offspring are born on each side, a uniform sample of all the matings
+		#the time it takes is added to self.metrics, if there is one
+		timer = self.metrics.timer if self.metrics is not None else _untimed
+		with timer('reproduction'):
+			return Generation(ancestors=self.population.select(list(self.predator_slots) + list(self.prey_slots)),
+				batched=batched, lineage=self.lineage, capacity=capacity)
 
 
-	def simulation_report(self):
+	def summary(self):
 		"""
-		Provides a summary of how a given Generation looks after simulation_has_run
+		The numbers simulation_report prints, as a plain dict: the counters in summary_counters plus the generation id, 
+		and under 'means' the integer mean of each stat as [predator, prey] (None once either side has died out). 
+		'spread' has the exact mean, variance, min and max of each stat the same way. All of it is read straight off
+		self.stats.
+		"""
+		summary = dict((name, getattr(self, name)) for name in Generation.summary_counters)
+		summary['id'] = self.id
+
+		if len(self.predator_slots) == 0 or len(self.prey_slots) == 0:
+			summary['means'] = None
+			summary['spread'] = None
+			return summary
+
+		summary['means'] = {}
+		summary['spread'] = {}
+		for attr in Generation.tracked_stats:
+			sides = (self.stats['predator'][attr], self.stats['prey'][attr])
+			summary['means'][attr] = [stats.int_mean() for stats in sides]
+			summary['spread'][attr] = [stats.spread() for stats in sides]
+		return summary
+
+
+	def simulation_report(self, sink=None):
+		"""
+		Provides a summary of how a given Generation looks after simulation_has_run, as a report_ready event to sink 
+		(printed, if no sink is given)
 		"""
 		if not self.simulation_has_run:
 			return False
 
-		if len(self.predators) == 0 or len(self.prey) == 0:
-			print "Population has collapsed!"
+		if sink is None:
+			sink = ConsoleSink()
+		summary = self.summary()
+		sink.report_ready(summary)
+		if summary['means'] is None:
 			return False
-
-		mean_predator_speed = sum([o.speed for o in self.predators]) / len(self.predators)
-		mean_prey_speed = sum([o.speed for o in self.prey]) / len(self.prey)
-		
-		mean_predator_willpower = sum([o.willpower for o in self.predators]) / len(self.predators)
-		mean_prey_willpower = sum([o.willpower for o in self.prey]) / len(self.prey)
-		
-		mean_predator_power = sum([o.power for o in self.predators]) / len(self.predators)
-		mean_prey_power = sum([o.power for o in self.prey]) / len(self.prey)
-		
-		mean_predator_fortitude= sum([o.fortitude for o in self.predators]) / len(self.predators)
-		mean_prey_fortitude = sum([o.fortitude for o in self.prey]) / len(self.prey)
-		
-		mean_predator_stealth = sum([o.stealth for o in self.predators]) / len(self.predators)
-		mean_prey_stealth = sum([o.stealth for o in self.prey]) / len(self.prey)
-		
-		mean_predator_perception = sum([o.perception for o in self.predators]) / len(self.predators)
-		mean_prey_perception = sum([o.perception for o in self.prey]) / len(self.prey)
-		
-		mean_predator_virility = sum([o.virility for o in self.predators]) / len(self.predators)
-		mean_prey_virility = sum([o.virility for o in self.prey]) / len(self.prey)
-
-		mean_predator_hunger = sum([o.hunger for o in self.predators]) / len(self.predators)
-		mean_prey_hunger = sum([o.hunger for o in self.prey]) / len(self.prey)
-
-		print "Generation {} Report".format(self.id)
-		print "    Average Stats    "
-		print "---------------------"
-		print "   Predator | Prey   "
-		print "Spd:  {}         {}  ".format(mean_predator_speed, mean_prey_speed)
-		print "WP:   {}         {}  ".format(mean_predator_willpower, mean_prey_willpower)
-		print "Pwr:  {}         {}  ".format(mean_predator_power, mean_prey_power)
-		print "Frt:  {}         {}  ".format(mean_predator_fortitude, mean_prey_fortitude)
-		print "Sth:  {}         {}  ".format(mean_predator_stealth, mean_prey_stealth)
-		print "Per:  {}         {}  ".format(mean_predator_perception, mean_prey_perception)
-		print "Vir:  {}         {}  ".format(mean_predator_virility, mean_prey_virility)
-		print "Hgr:  {}         {}  ".format(mean_predator_hunger, mean_prey_hunger)
-		print "---------------------\n\r\n\r"
-		print "{} Predators after combat (I:{})".format(self.post_combat_predator_count, self.initial_predator_count)
-		print "{} Prey after combat (I:{})".format(self.post_combat_prey_count, self.initial_prey_count)
-		print "{} Total after combat (I:{})".format(self.post_combat_total_count, self.initial_total_count)
-		print "Deaths to starvation: {}".format(self.prey_hunger_death_count+self.predator_hunger_death_count)	
-		print "Final size of Generation {}: {} (Initial viable: {}, NV: {})".format(self.id, self.final_total_count, self.initial_total_count, self.nonviable_predator_count+self.nonviable_prey_count)
-
 		return self
 
 
@@ -646,6 +2458,711 @@ class Generation(object):
 
 
 
+def print_report(summary):
+	"""
+	Prints a Generation summary() the way simulation_report always has. Returns False if the population had collapsed
+	"""
+	if summary['means'] is None:
+		print("Population has collapsed!")
+		return False
+
+	means = summary['means']
+	print("Generation {} Report".format(summary['id']))
+	print("    Average Stats    ")
+	print("---------------------")
+	print("   Predator | Prey   ")
+	print("Spd:  {}         {}  ".format(*means['speed']))
+	print("WP:   {}         {}  ".format(*means['willpower']))
+	print("Pwr:  {}         {}  ".format(*means['power']))
+	print("Frt:  {}         {}  ".format(*means['fortitude']))
+	print("Sth:  {}         {}  ".format(*means['stealth']))
+	print("Per:  {}         {}  ".format(*means['perception']))
+	print("Vir:  {}         {}  ".format(*means['virility']))
+	print("Hgr:  {}         {}  ".format(*means['hunger']))
+	print("---------------------\n\r\n\r")
+	print("{} Predators after combat (I:{})".format(summary['post_combat_predator_count'], summary['initial_predator_count']))
+	print("{} Prey after combat (I:{})".format(summary['post_combat_prey_count'], summary['initial_prey_count']))
+	print("{} Total after combat (I:{})".format(summary['post_combat_total_count'], summary['initial_total_count']))
+	print("Deaths to starvation: {}".format(summary['prey_hunger_death_count']+summary['predator_hunger_death_count']))
+	print("Final size of Generation {}: {} (Initial viable: {}, NV: {})".format(summary['id'], summary['final_total_count'], summary['initial_total_count'], summary['nonviable_predator_count']+summary['nonviable_prey_count']))
+	return True
+
+
+
+
+class NullSink(object):
+	"""
+	Receives the events of a run; Generation.simulate_generation and Epoch send them instead of printing. This one 
+	ignores them all, for silent runs. Subclass it and override the events you care about.
+
+	generation and epoch are the live objects, so they are only good for reading while the event is being handled;
+	summary is a Generation.summary() dict and can be kept.
+	"""
+
+	#every event, in the order a generation sends them
+	events = ('generation_started', 'cache_hit', 'pairing_started', 'pairing_done', 'combat_started', 'combat_done',
+		'hunger_started', 'hunger_done', 'report_ready', 'mating_started', 'mating_done', 'collapse', 'epoch_done')
+
+	def generation_started(self, generation, final):
+		#Epoch is about to simulate generation; final is True for the last one
+		pass
+
+	def cache_hit(self, generation):
+		#generation's outcome was loaded from a GenerationCache; it takes the place of everything up to hunger_done
+		pass
+
+	def pairing_started(self, generation):
+		pass
+
+	def pairing_done(self, generation):
+		pass
+
+	def combat_started(self, generation):
+		pass
+
+	def combat_done(self, generation):
+		#the duels are settled; the post_combat counters are filled in
+		pass
+
+	def hunger_started(self, generation, leftover_count, leftover_type):
+		pass
+
+	def hunger_done(self, generation):
+		pass
+
+	def report_ready(self, summary):
+		#generation summary() after it has been simulated; 'means' is None if a side has died out
+		pass
+
+	def mating_started(self, generation):
+		pass
+
+	def mating_done(self, generation):
+		#generation is the newborn one
+		pass
+
+	def collapse(self, generation):
+		#the newborn generation has no predators or no prey; the Epoch stops here
+		pass
+
+	def epoch_done(self, epoch):
+		#all target_iterations generations have run; epoch.summaries holds every report
+		pass
+
+
+class ConsoleSink(NullSink):
+	"""
+	Prints a run's progress and reports to stdout, exactly as the simulation always has.
+	"""
+
+	def generation_started(self, generation, final):
+		if final:
+			print("Simulating G{}; FINAL ITERATION".format(generation.id))
+		else:
+			print("Simulating G{}".format(generation.id))
+		print("Initial: {} (Py: {}) (Pd: {}) (Nv: {})".format(generation.initial_total_count, generation.initial_prey_count, generation.initial_predator_count, generation.nonviable_prey_count+generation.nonviable_predator_count))
+
+	def cache_hit(self, generation):
+		print("Loaded G{} from cache".format(generation.id))
+
+	def pairing_started(self, generation):
+		print("Generating Pairing Dictionary for G{}".format(generation.id))
+
+	def pairing_done(self, generation):
+		print("...Done.")
+
+	def combat_started(self, generation):
+		print("Running Combat Trials for G{}".format(generation.id))
+
+	def combat_done(self, generation):
+		print("...Done.")
+
+	def hunger_started(self, generation, leftover_count, leftover_type):
+		print("Running Hunger Trials for G{}".format(generation.id))
+		print("{} {}s for Hunger Trials".format(leftover_count, leftover_type))
+		print("Imbalance: {}".format(generation.post_combat_population_imbalance))
+
+	def hunger_done(self, generation):
+		print("...Done.")
+
+	def report_ready(self, summary):
+		print_report(summary)
+
+	def mating_started(self, generation):
+		print("Beginning mating cycle to spawn G{}...".format(generation.id+1))
+
+	def mating_done(self, generation):
+		print("...Done\n\r\n\r")
+
+	def collapse(self, generation):
+		print("Population collapse. Terminating simulation.")
+		print("Pd: {}   Py: {}".format(generation.final_predator_count, generation.final_prey_count))
+
+	def epoch_done(self, epoch):
+		print("-----------------------\n\r\n\r")
+		print("{} generations simulated".format(epoch.target_iterations))
+		print("G0 vs G{}".format(epoch.target_iterations))
+		print("-----------------------\n\r\n\r")
+		print_report(epoch.summaries[0])
+		print_report(epoch.summaries[-1])
+
+
+class TeeSink(NullSink):
+	"""
+	Passes every event on to each of sinks in turn, e.g. TeeSink(ConsoleSink(), ExportSink('run.csv')).
+	"""
+
+	def __init__(self, *sinks):
+		self.sinks = sinks
+
+def _forward(event):
+	def forward(self, *args):
+		for sink in self.sinks:
+			getattr(sink, event)(*args)
+	forward.__name__ = event
+	return forward
+
+for _event in NullSink.events:
+	setattr(TeeSink, _event, _forward(_event))
+
+
+class ExportSink(NullSink):
+	"""
+	Appends every generation's summary() to columnar files as the run goes, one row per generation, so a run (or a
+	sweep of them) can be analysed without parsing console output. The columns are export_columns(): the generation id,
+	the island (see Archipelago; empty for an Epoch), Generation.summary_counters, and the mean, variance, min and max 
+	of every tracked stat for each side (empty once a side has died out).
+
+	path is a CSV file; it is appended to, with a header row if it is new. arrow_path, if given, is an Arrow IPC file
+	written in batches of arrow_batch rows; it needs pyarrow, and is only complete once the run has ended (epoch_done
+	or collapse) or close() has been called.
+
+	organisms_dir, if given, gets every organism alive at the end of each generation: one raw binary file per column
+	(id, predator and Population.stat_columns) of Population.typecode values, written chunk_size rows at a time, plus
+	index.csv with each generation's first row and row count. Read them back with organism_column. The dump is
+	appended with plain buffered writes, not through a memory map: a map can't grow with the file, so every generation 
+	would have to extend each column file and map the new stretch before copying into it, which is the same copy a 
+	write makes, with more system calls. Reading back only part of a column is where a map pays off, and that is where
+	organism_column uses one.
+	"""
+
+	sides = ('predator', 'prey')
+	spread_fields = ('mean', 'variance', 'min', 'max')
+	organism_columns = ('id', 'predator') + Population.stat_columns
+
+	def __init__(self, path, arrow_path=None, organisms_dir=None, arrow_batch=64, chunk_size=65536):
+		self.path = path
+		self.arrow_path = arrow_path
+		self.organisms_dir = organisms_dir
+		self.arrow_batch = arrow_batch
+		self.chunk_size = chunk_size
+		self.columns = ExportSink.export_columns()
+
+		if arrow_path is not None and pyarrow is None:
+			raise ValueError("Arrow export needs pyarrow")
+		self.arrow_writer = None
+		self.arrow_rows = []
+
+		if organisms_dir is not None and not os.path.isdir(organisms_dir):
+			os.makedirs(organisms_dir)
+
+	@staticmethod
+	def export_columns():
+		columns = ['id', 'island'] + list(Generation.summary_counters)
+		for attr in Generation.tracked_stats:
+			for side in ExportSink.sides:
+				columns.extend('{}_{}_{}'.format(side, attr, field) for field in ExportSink.spread_fields)
+		return columns
+
+	@staticmethod
+	def row(summary):
+		#summary() flattened into export_columns() order; None where a side has died out, or for the island of an Epoch
+		row = [summary['id'], summary.get('island')] + [summary[name] for name in Generation.summary_counters]
+		for attr in Generation.tracked_stats:
+			for i in range(0, len(ExportSink.sides)):
+				spread = summary['spread'][attr][i] if summary['spread'] is not None else {}
+				row.extend(spread.get(field) for field in ExportSink.spread_fields)
+		return row
+
+	def report_ready(self, summary):
+		row = ExportSink.row(summary)
+		new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+		with open_csv(self.path, 'a') as f:
+			writer = csv.writer(f)
+			if new_file:
+				writer.writerow(self.columns)
+			writer.writerow(['' if value is None else value for value in row])
+
+		if self.arrow_path is not None:
+			self.arrow_rows.append(row)
+			if len(self.arrow_rows) >= self.arrow_batch:
+				self.flush_arrow()
+
+	def hunger_done(self, generation):
+		#the survivors are final once hunger trials are over
+		if self.organisms_dir is not None:
+			self.dump_organisms(generation)
+
+	def cache_hit(self, generation):
+		#likewise once they have been loaded from a cache
+		if self.organisms_dir is not None:
+			self.dump_organisms(generation)
+
+	def collapse(self, generation):
+		self.close()
+
+	def epoch_done(self, epoch):
+		self.close()
+
+	def arrow_schema(self):
+		fields = []
+		for name in self.columns:
+			if name == 'post_combat_population_imbalance' or name.endswith('_mean') or name.endswith('_variance'):
+				fields.append(pyarrow.field(name, pyarrow.float64()))
+			else:
+				fields.append(pyarrow.field(name, pyarrow.int64()))
+		return pyarrow.schema(fields)
+
+	def flush_arrow(self):
+		#writes the buffered rows to the Arrow file as one record batch
+		if not self.arrow_rows:
+			return
+		if self.arrow_writer is None:
+			self.arrow_writer = pyarrow.ipc.new_file(self.arrow_path, self.arrow_schema())
+		schema = self.arrow_writer.schema
+		arrays = [pyarrow.array([row[i] for row in self.arrow_rows], type=schema.field(i).type)
+			for i in range(0, len(self.columns))]
+		self.arrow_writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+		self.arrow_rows = []
+
+	def close(self):
+		#writes out whatever is still buffered and finishes the Arrow file
+		if self.arrow_path is None:
+			return
+		self.flush_arrow()
+		if self.arrow_writer is not None:
+			self.arrow_writer.close()
+			self.arrow_writer = None
+
+	def dump_organisms(self, generation):
+		population = generation.population
+		slots = list(generation.predator_slots) + list(generation.prey_slots)
+		index_path = os.path.join(self.organisms_dir, 'index.csv')
+		id_path = os.path.join(self.organisms_dir, 'id.bin')
+		start = os.path.getsize(id_path) // array.array(Population.typecode).itemsize if os.path.exists(id_path) else 0
+
+		for name in ExportSink.organism_columns:
+			column = getattr(population, name)
+			with open(os.path.join(self.organisms_dir, name + '.bin'), 'ab') as f:
+				for first in range(0, len(slots), self.chunk_size):
+					array.array(Population.typecode, [column[s] for s in slots[first:first + self.chunk_size]]).tofile(f)
+
+		new_index = not os.path.exists(index_path)
+		with open_csv(index_path, 'a') as f:
+			writer = csv.writer(f)
+			if new_index:
+				writer.writerow(['generation', 'start', 'count', 'typecode'])
+			writer.writerow([generation.id, start, len(slots), Population.typecode])
+
+	@staticmethod
+	def organism_column(organisms_dir, name, generation):
+		"""
+		One column of an organisms_dir dump for a single generation, as an array; only that generation's rows are read,
+		through a memory map of the column file. None if the generation isn't in the dump.
+		"""
+		with open_csv(os.path.join(organisms_dir, 'index.csv'), 'r') as f:
+			entries = [entry for entry in csv.DictReader(f) if int(entry['generation']) == generation]
+		if not entries:
+			return None
+		column = array.array(str(entries[-1]['typecode']))
+		first = int(entries[-1]['start']) * column.itemsize
+		last = first + int(entries[-1]['count']) * column.itemsize
+		if last == first:
+			return column
+		with open(os.path.join(organisms_dir, name + '.bin'), 'rb') as f:
+			mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			try:
+				array_from_bytes(column, mapped[first:last])
+			finally:
+				mapped.close()
+		return column
+
+
+
+class LineageStore(object):
+	"""
+	An append-only genealogy of every organism born into a run: a file of fixed-width records (see record_struct), one
+	per organism, in id order. Generations given one record their newborns as they are created; generation 0 has
+	no_parent for its parents. Queries read the file through a memory map, so they work on stores far bigger than
+	memory: get() and ancestors() find records by binary search on the id, descendants() makes one forward pass (a
+	numpy one, when numpy is available) since children always come after their parents.
+
+	Ids only go up, so if newborns arrive with ids the store already has (a run resumed from a checkpoint taken before
+	them), the records from there on are dropped first; the store always describes the latest version of the run.
+	"""
+
+	#id, parent a id, parent b id, generation id, flags (flag_predator | flag_viable), padding, Population.raw_columns
+	record_struct = struct.Struct('<qqqiB3x7q')
+	record_size = record_struct.size
+	no_parent = -1
+	flag_predator = 1
+	flag_viable = 2
+
+	def __init__(self, path):
+		self.path = path
+		self.file = open(path, 'ab+')
+		size = os.fstat(self.file.fileno()).st_size
+		if size % LineageStore.record_size:
+			#a crash left half a record at the end
+			size -= size % LineageStore.record_size
+			self.file.truncate(size)
+		self.count = size // LineageStore.record_size
+		self.last_id = self.read_id(self.count - 1) if self.count else None
+
+	def __len__(self):
+		return self.count
+
+	def close(self):
+		self.file.close()
+
+	def clear(self):
+		#drops every record
+		self.file.truncate(0)
+		self.count = 0
+		self.last_id = None
+
+	@staticmethod
+	def numpy_dtype():
+		#record_struct as a numpy structured dtype
+		return numpy.dtype([('id', '<i8'), ('parent_a', '<i8'), ('parent_b', '<i8'), ('generation', '<i4'), ('flags', 'u1'),
+			('pad', 'V3'), ('raws', '<i8', (7,))])
+
+	def record(self, generation_id, population, parent_a=None, parent_b=None):
+		"""
+		Appends a record for every row of population, which belongs to generation generation_id; parent_a[i] and 
+		parent_b[i] are the ids of row i's parents, or None for generation 0.
+		"""
+		n = len(population)
+		if n == 0:
+			return
+		if self.last_id is not None and population.id[0] <= self.last_id:
+			self.rewind(population.id[0])
+
+		if numpy is not None:
+			records = numpy.zeros(n, dtype=LineageStore.numpy_dtype())
+			records['id'] = population.numpy_column('id')
+			records['parent_a'] = parent_a if parent_a is not None else LineageStore.no_parent
+			records['parent_b'] = parent_b if parent_b is not None else LineageStore.no_parent
+			records['generation'] = generation_id
+			records['flags'] = (population.numpy_column('predator') * LineageStore.flag_predator + 
+				population.numpy_column('viable') * LineageStore.flag_viable)
+			for i, name in enumerate(Population.raw_columns):
+				records['raws'][:, i] = population.numpy_column(name)
+			data = records.tobytes()
+		else:
+			pack = LineageStore.record_struct.pack
+			if parent_a is None:
+				parent_a = parent_b = [LineageStore.no_parent] * n
+			flags = [predator * LineageStore.flag_predator + viable * LineageStore.flag_viable
+				for predator, viable in zip(population.predator, population.viable)]
+			data = b''.join(pack(*fields) for fields in zip(population.id, parent_a, parent_b, [generation_id] * n, flags,
+				*[getattr(population, name) for name in Population.raw_columns]))
+
+		self.file.seek(0, os.SEEK_END)
+		self.file.write(data)
+		self.file.flush()
+		self.count += n
+		self.last_id = population.id[n - 1]
+
+	def rewind(self, organism_id):
+		#drops every record from organism_id on
+		self.count = self.position(organism_id, exact=False)
+		self.file.truncate(self.count * LineageStore.record_size)
+		self.last_id = self.read_id(self.count - 1) if self.count else None
+
+	def read_id(self, position):
+		self.file.seek(position * LineageStore.record_size)
+		return struct.unpack('<q', self.file.read(8))[0]
+
+	@contextlib.contextmanager
+	def mapped(self):
+		#a read-only memory map of the store as it stands
+		self.file.flush()
+		if not self.count:
+			yield b''
+			return
+		m = mmap.mmap(self.file.fileno(), self.count * LineageStore.record_size, access=mmap.ACCESS_READ)
+		try:
+			yield m
+		finally:
+			m.close()
+
+	def position(self, organism_id, exact=True, mapped=None):
+		"""
+		Index of organism_id's record, by binary search. With exact=False, the index of the first record with an id at 
+		least organism_id instead, whether or not there is one for it. None if exact and it isn't in the store.
+		"""
+		if mapped is None:
+			with self.mapped() as m:
+				return self.position(organism_id, exact, m)
+		unpack_from = struct.unpack_from
+		size = LineageStore.record_size
+		low, high = 0, self.count
+		while low < high:
+			middle = (low + high) // 2
+			if unpack_from('<q', mapped, middle * size)[0] < organism_id:
+				low = middle + 1
+			else:
+				high = middle
+		if exact and (low == self.count or unpack_from('<q', mapped, low * size)[0] != organism_id):
+			return None
+		return low
+
+	def get(self, organism_id, mapped=None):
+		"""
+		organism_id's record as a dict (id, parents as a tuple of ids, generation, predator, viable and raws, in
+		Population.raw_columns order), or None if it isn't in the store.
+		"""
+		if mapped is None:
+			with self.mapped() as m:
+				return self.get(organism_id, m)
+		position = self.position(organism_id, mapped=mapped)
+		if position is None:
+			return None
+		fields = LineageStore.record_struct.unpack_from(mapped, position * LineageStore.record_size)
+		return {
+			'id': fields[0],
+			'parents': fields[1:3],
+			'generation': fields[3],
+			'predator': bool(fields[4] & LineageStore.flag_predator),
+			'viable': bool(fields[4] & LineageStore.flag_viable),
+			'raws': fields[5:],
+		}
+
+	def ancestors(self, organism_id, generations=None):
+		"""
+		Every recorded ancestor of organism_id, up to generations back if given, as {ancestor id: generations back}
+		(the nearest, where an ancestor turns up on more than one line).
+		"""
+		found = {}
+		with self.mapped() as m:
+			frontier = [organism_id]
+			depth = 0
+			while frontier and (generations is None or depth < generations):
+				depth += 1
+				parents = set()
+				for child in frontier:
+					record = self.get(child, m)
+					if record is None:
+						continue
+					parents.update(parent for parent in record['parents'] if parent != LineageStore.no_parent and parent not in found)
+				for parent in parents:
+					found[parent] = depth
+				frontier = parents
+		return found
+
+	def descendants(self, organism_id):
+		#the ids of every recorded descendant of organism_id, in birth order
+		with self.mapped() as m:
+			start = self.position(organism_id, exact=False, mapped=m)
+			if start is None or start >= self.count:
+				return []
+			if numpy is not None:
+				records = numpy.frombuffer(m, dtype=LineageStore.numpy_dtype(), count=self.count)[start:]
+				#nobody is the parent of someone in their own generation, so each generation can be checked in one go
+				breaks = numpy.flatnonzero(numpy.diff(records['generation'])) + 1
+				found = numpy.array([organism_id], dtype=numpy.int64)
+				descendants = []
+				for block in numpy.split(numpy.arange(len(records)), breaks):
+					children = block[numpy.in1d(records['parent_a'][block], found) | numpy.in1d(records['parent_b'][block], found)]
+					if len(children):
+						ids = records['id'][children]
+						descendants.extend(ids.tolist())
+						found = numpy.concatenate((found, ids))
+				del records
+				return descendants
+			found = set([organism_id])
+			descendants = []
+			unpack_from = LineageStore.record_struct.unpack_from
+			for position in range(start, self.count):
+				fields = unpack_from(m, position * LineageStore.record_size)
+				if fields[1] in found or fields[2] in found:
+					found.add(fields[0])
+					descendants.append(fields[0])
+			return descendants
+
+
+
+class GenerationCache(object):
+	"""
+	A cache on disk of simulated generations, for runs that keep simulating the same ones: a sweep over 
+	target_iterations or later settings with the same seeds and sizes goes through the same early generations every 
+	time. simulate_generation looks a generation up before simulating it, under a key that hashes everything the 
+	outcome depends on: the code (see rules_hash), the engine and number of workers, the duel seed, the random module's 
+	state and the generation's columns and slots. An entry holds the outcome: the columns and slots afterwards, the 
+	counters and stats simulate_generation fills in, and the random module's state at the end, which a hit puts back so 
+	the run carries on exactly as if the generation had been simulated.
+
+	Each entry is a file in directory, laid out like a checkpoint. Loading an entry touches its file; whenever a store 
+	takes the files past max_bytes, the least recently used are deleted until they fit. Any edit to thehunt.py changes 
+	every key, so entries from older code are never loaded again and go first. Several processes can share a directory.
+	"""
+
+	magic = b'HUNTGENC'
+	version = 1
+
+	#the counters simulate_generation fills in
+	outcome_counters = ('post_combat_predator_count', 'post_combat_prey_count', 'post_combat_total_count',
+		'post_combat_population_imbalance', 'predator_hunger_death_count', 'prey_hunger_death_count',
+		'final_predator_count', 'final_prey_count', 'final_total_count')
+
+	def __init__(self, directory, max_bytes=256 * 2**20):
+		self.directory = directory
+		self.max_bytes = max_bytes
+		self.rules = GenerationCache.rules_hash()
+		self.hits = 0
+		self.misses = 0
+		try:
+			os.makedirs(directory)
+		except OSError:
+			if not os.path.isdir(directory):
+				raise
+		self.evict()
+
+	@staticmethod
+	def rules_hash():
+		#fingerprint of the whole of this module's source: simulate_generation reaches into so much of it (the dice, three
+		#engines, the world, hunger trials) that any list of functions would sooner or later miss one
+		return hashlib.sha1(inspect.getsource(sys.modules[__name__]).encode('utf-8')).hexdigest()
+
+	def key(self, generation, engine, workers, seed):
+		#the key generation is stored under when simulated this way from the random module's current state
+		population = generation.population
+		columns = _column_layout(population)
+		digest = hashlib.sha1()
+		digest.update(json.dumps([GenerationCache.version, self.rules, engine, workers, seed, random.getstate(),
+			Population.typecode, columns, len(generation.predator_slots), len(generation.prey_slots)]).encode('utf-8'))
+		for name, offset, nbytes in columns:
+			column = getattr(population, name)
+			digest.update(array_to_bytes(column) if isinstance(column, array.array) else bytes(column))
+		digest.update(array_to_bytes(generation.predator_slots))
+		digest.update(array_to_bytes(generation.prey_slots))
+		return digest.hexdigest()
+
+	def path(self, key):
+		return os.path.join(self.directory, key + '.gen')
+
+	def load(self, key, generation):
+		"""
+		Puts the outcome stored under key into generation, as though it had just been simulated, and the random module 
+		back in the state the simulation left it in. Returns False, changing nothing, if there is no such entry.
+		"""
+		path = self.path(key)
+		try:
+			f = open(path, 'rb')
+		except (IOError, OSError):
+			#missing, or being evicted by another process
+			self.misses += 1
+			return False
+		with f:
+			if f.read(8) != GenerationCache.magic:
+				raise ValueError("{} is not a cached generation".format(path))
+			version, header_length = struct.unpack('<II', f.read(8))
+			if version != GenerationCache.version:
+				self.misses += 1
+				return False
+			header = json.loads(f.read(header_length).decode('utf-8'))
+			population = _read_columns(f, _align(16 + header_length), header)
+		try:
+			os.utime(path, None)
+		except OSError:
+			pass
+
+		generation.population = population
+		generation.predator_slots = array.array(Population.typecode, header['predator_slots'])
+		generation.prey_slots = array.array(Population.typecode, header['prey_slots'])
+		for name in GenerationCache.outcome_counters:
+			setattr(generation, name, header['counters'][name])
+		for side in ('predator', 'prey'):
+			for attr in Generation.tracked_stats:
+				generation.stats[side][attr].setstate(header['stats'][side][attr])
+		generation.simulation_has_run = True
+
+		version, internal_state, gauss_next = header['random_state']
+		random.setstate((version, tuple(internal_state), gauss_next))
+		self.hits += 1
+		return True
+
+	def store(self, key, generation):
+		#saves simulated generation's outcome under key, then evicts whatever no longer fits
+		population = generation.population
+		columns = _column_layout(population)
+		header = {
+			'predator_slots': list(generation.predator_slots),
+			'prey_slots': list(generation.prey_slots),
+			'counters': dict((name, getattr(generation, name)) for name in GenerationCache.outcome_counters),
+			'stats': dict((side, dict((attr, generation.stats[side][attr].getstate()) for attr in Generation.tracked_stats))
+				for side in ('predator', 'prey')),
+			'random_state': random.getstate(),
+			'typecode': Population.typecode,
+			'itemsize': population.id.itemsize,
+			'byteorder': sys.byteorder,
+			'columns': columns,
+		}
+		blob = json.dumps(header).encode('utf-8')
+		data_start = _align(16 + len(blob))
+
+		#written alongside and renamed into place, so other processes never see half an entry
+		path = self.path(key)
+		partial = '{}.{}.partial'.format(path, os.getpid())
+		with open(partial, 'wb') as f:
+			f.write(GenerationCache.magic)
+			f.write(struct.pack('<II', GenerationCache.version, len(blob)))
+			f.write(blob)
+			f.write(b'\0' * (data_start - 16 - len(blob)))
+			_write_columns(f, population, columns)
+		os.rename(partial, path)
+		self.evict()
+
+	def entries(self):
+		#(last used, bytes, path) of every entry, least recently used first
+		entries = []
+		for name in os.listdir(self.directory):
+			if not name.endswith('.gen'):
+				continue
+			path = os.path.join(self.directory, name)
+			try:
+				info = os.stat(path)
+			except OSError:
+				continue
+			entries.append((info.st_mtime, info.st_size, path))
+		return sorted(entries)
+
+	def size(self):
+		return sum(nbytes for used, nbytes, path in self.entries())
+
+	def evict(self):
+		#deletes the least recently used entries until the rest fit in max_bytes
+		entries = self.entries()
+		total = sum(nbytes for used, nbytes, path in entries)
+		for used, nbytes, path in entries:
+			if total <= self.max_bytes:
+				break
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+			total -= nbytes
+
+	def clear(self):
+		for used, nbytes, path in self.entries():
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+
+
+
 class Epoch(object):
 
 	"""
@@ -654,6 +3171,11 @@ class Epoch(object):
 
 	epoch_counter = 0
 
+	#checkpoint file layout: magic, then version and header length as little-endian uint32s, the JSON header, and the
+	#population columns, each starting on an 8-byte boundary
+	checkpoint_magic = b'HUNTCKPT'
+	checkpoint_version = 1
+
 	def __init__(self, initial_size, target_iterations, **kwargs):
 		Epoch.epoch_counter += 1
 		self.id = Epoch.epoch_counter
@@ -663,44 +3185,452 @@ class Epoch(object):
 		self.target_iterations = target_iterations
 		self.simulation_has_run = False
 
+		#'python', 'numpy' or 'world'; see Generation.simulate_generation. Unlike in duels, a survivor in the world carries
+		#its wounds from one fight into the next; its fortitude is only reset once the generation's combat is over
+		self.engine = kwargs.get('engine', 'python')
+		if self.engine == 'numpy' and numpy is None:
+			raise ImportError("The vectorized combat engine requires numpy")
+		#number of processes to play each generation's duels on; the pool is started with the first generation that needs
+		#it and kept until the run is over (see worker_pool)
+		self.workers = kwargs.get('workers', 1)
+		self.pool = None
+		#run seed; seeds the random module when simulate() starts and every generation's duel seed is drawn from it
+		self.seed = kwargs.get('seed', None)
+		#if set, save_checkpoint(checkpoint_path) runs after every checkpoint_every generations
+		self.checkpoint_path = kwargs.get('checkpoint_path', None)
+		self.checkpoint_every = kwargs.get('checkpoint_every', 1)
+		#if set, only generation 0 and the latest window generations are kept in self.generations; see iter_generations
+		self.window = kwargs.get('window', None)
+		#where progress and reports go; NullSink() for a silent run
+		self.sink = kwargs.get('sink', None) or ConsoleSink()
+		#if True, every generation is simulated with a Metrics, and they are all collected in self.metrics
+		self.instrument = kwargs.get('instrument', False)
+		self.metrics = []
+		#if set, every organism born in the run is recorded in a LineageStore at lineage_path. A store that already has
+		#records in it belongs to another run: it is refused, unless lineage_overwrite is set to start it over. A run
+		#resumed with load_checkpoint carries on in its own store instead
+		self.lineage_path = kwargs.get('lineage_path', None)
+		self.lineage = None
+		if self.lineage_path is not None:
+			self.lineage = LineageStore(self.lineage_path)
+			if len(self.lineage) and not kwargs.get('lineage_overwrite', False):
+				self.lineage.close()
+				raise ValueError("{} already holds a lineage; pass lineage_overwrite=True to start it over, or resume its run "
+					"with Epoch.load_checkpoint".format(self.lineage_path))
+			self.lineage.clear()
+		#if set, no more than capacity offspring are born on each side per generation; see Generation.reproduce
+		self.capacity = kwargs.get('capacity', None)
+		#an OutcomeTable to settle duels from (python engine only); it isn't saved in checkpoints
+		self.outcome_table = kwargs.get('outcome_table', None)
+		#a DuelRecorder to record a sample of the duels in (python engine only); closed by simulate()
+		self.recorder = kwargs.get('recorder', None)
+		#a GenerationCache to look generations up in before simulating them; it isn't saved in checkpoints either
+		self.cache = kwargs.get('cache', None)
+
+		#summary() of every generation simulated so far
+		self.summaries = []
+		#the generation to simulate next, and how many generations have been created in all
+		self.current = None
+		self.generation_count = 0
+
 	def simulate(self):
 		"""
 		Creates a generation of size defined by initial_size, simulates it, runs a mating cycle to create a new generation,
 		simulates it, etc. until the number of generations set in the arguments has been run.
+		An Epoch restored with load_checkpoint carries on from the generation it was saved at.
 		"""
-		gen = Generation(n=self.initial_size)
-		self.generations.append(gen)
+		for summary in self.iter_generations():
+			pass
+		if self.recorder is not None:
+			self.recorder.close()
+		if not self.population_collapse:
+			self.sink.epoch_done(self)
+		return self
+
+	def iter_generations(self):
+		"""
+		The generator behind simulate(): runs the Epoch one generation at a time, yielding each generation's summary()
+		once it has been simulated (and, unless it was the last, once its offspring have been born).
 
+		With the window keyword set, self.generations only holds generation 0 and the latest window generations; older 
+		ones are dropped as the run goes, so memory stays flat however many generations are run. The summaries of all
+		of them stay in self.summaries.
 
-		while len(self.generations) < self.target_iterations:
-			print "Simulating G{}".format(gen.id)
-			print "Initial: {} (Py: {}) (Pd: {}) (Nv: {})".format(gen.initial_total_count, gen.initial_prey_count, gen.initial_predator_count, gen.nonviable_prey_count+gen.nonviable_predator_count)
-			gen = gen.simulate_generation()
-			print "Beginning mating cycle to spawn G{}...".format(gen.id+1)
-			gen = gen.reproduce()
-			self.generations.append(gen)
-			print "...Done\n\r\n\r"
-			if len(gen.predators) == 0 or len(gen.prey) == 0:
+		The worker pool, if there is one, is shut down when the run is over or the generator is closed.
+		"""
+		try:
+			for summary in self.run_generations():
+				yield summary
+		finally:
+			self.close_pool()
+
+	def run_generations(self):
+		#iter_generations, less the pool shutdown
+		if self.current is None:
+			if self.seed is not None:
+				random.seed(self.seed)
+			self.current = Generation(n=self.initial_size, lineage=self.lineage)
+			self.generations.append(self.current)
+			self.generation_count = 1
+
+		gen = self.current
+		while True:
+			final = self.generation_count >= self.target_iterations
+			self.sink.generation_started(gen, final)
+			metrics = Metrics() if self.instrument else None
+			if metrics is not None:
+				self.metrics.append(metrics)
+			gen = gen.simulate_generation(engine=self.engine, workers=self.workers, seed=self.generation_seed(), sink=self.sink,
+				metrics=metrics, outcome_table=self.outcome_table, recorder=self.recorder, cache=self.cache,
+				pool=self.worker_pool())
+			summary = gen.summary()
+			self.summaries.append(summary)
+			if final:
+				self.simulation_has_run = True
+				yield summary
+				return
+
+			self.sink.mating_started(gen)
+			gen = gen.reproduce(capacity=self.capacity)
+			self.current = gen
+			self.retain(gen)
+			self.generation_count += 1
+			self.sink.mating_done(gen)
+			if len(gen.predator_slots) == 0 or len(gen.prey_slots) == 0:
 				self.population_collapse = True
 				self.simulation_has_run = True
-				print "Population collapse. Terminating simulation."
-				print "Pd: {}   Py: {}".format(gen.final_predator_count, gen.final_prey_count)
-				return self
+				self.sink.collapse(gen)
+				yield summary
+				return
+			if self.checkpoint_path is not None and len(self.summaries) % self.checkpoint_every == 0:
+				self.save_checkpoint(self.checkpoint_path)
+			yield summary
+
+	def worker_pool(self):
+		#the run's multiprocessing.Pool, started on first use; None with a single worker
+		if self.workers > 1 and self.pool is None:
+			self.pool = multiprocessing.Pool(self.workers)
+		return self.pool
+
+	def close_pool(self):
+		if self.pool is not None:
+			self.pool.close()
+			self.pool.join()
+			self.pool = None
+
+	def retain(self, gen):
+		#adds gen to self.generations, letting go of whatever has slid out of the window (generation 0 always stays)
+		self.generations.append(gen)
+		if self.window is not None and len(self.generations) > self.window + 1:
+			del self.generations[1:len(self.generations) - self.window]
+
+	def save_checkpoint(self, path):
+		"""
+		Snapshots the run between generations: the population of the generation about to be simulated as packed columns,
+		the RNG state, the Organism/Generation counters, every summary so far and the run settings. It is not a pickle;
+		the header is JSON and the columns are raw arrays. load_checkpoint resumes the run exactly where this one is.
+
+		The file is written alongside path and renamed over it, so a crash mid-write leaves the last checkpoint intact.
+		"""
+		gen = self.current
+		if gen is None or gen.simulation_has_run:
+			raise ValueError("Checkpoints can only be taken between generations")
+
+		population = gen.population
+		columns = _column_layout(population)
+
+		header = {
+			'initial_size': self.initial_size,
+			'target_iterations': self.target_iterations,
+			'engine': self.engine,
+			'workers': self.workers,
+			'seed': self.seed,
+			'window': self.window,
+			'instrument': self.instrument,
+			'lineage_path': self.lineage_path,
+			'capacity': self.capacity,
+			'generation_count': self.generation_count,
+			'generation_id': gen.id,
+			'organism_counter': Organism.organism_counter,
+			'predator_counter': Organism.predator_counter,
+			'prey_counter': Organism.prey_counter,
+			'random_state': random.getstate(),
+			'summaries': self.summaries,
+			'typecode': Population.typecode,
+			'itemsize': population.id.itemsize,
+			'byteorder': sys.byteorder,
+			'columns': columns,
+		}
+		blob = json.dumps(header).encode('utf-8')
+		data_start = _align(16 + len(blob))
+
+		partial = path + '.partial'
+		with open(partial, 'wb') as f:
+			f.write(Epoch.checkpoint_magic)
+			f.write(struct.pack('<II', Epoch.checkpoint_version, len(blob)))
+			f.write(blob)
+			f.write(b'\0' * (data_start - 16 - len(blob)))
+			_write_columns(f, population, columns)
+		os.rename(partial, path)
+		return path
+
+	@classmethod
+	def load_checkpoint(cls, path, **kwargs):
+		"""
+		Rebuilds an Epoch from a save_checkpoint file, ready for simulate() to carry on. The population columns are 
+		read from the file straight into their arrays. Keyword arguments override the saved run settings (say, a
+		different number of workers); anything that changes how the dice fall will of course change the outcome.
+
+		The restored Epoch's generations list starts at the restored generation; earlier ones survive as summaries.
+		"""
+		with open(path, 'rb') as f:
+			if f.read(8) != Epoch.checkpoint_magic:
+				raise ValueError("{} is not a checkpoint".format(path))
+			version, header_length = struct.unpack('<II', f.read(8))
+			if version != Epoch.checkpoint_version:
+				raise ValueError("Unsupported checkpoint version {}".format(version))
+			header = json.loads(f.read(header_length).decode('utf-8'))
+			population = _read_columns(f, _align(16 + header_length), header)
+
+		settings = dict((key, header.get(key)) for key in ('engine', 'workers', 'seed', 'window', 'instrument', 'lineage_path', 'capacity'))
+		settings.update(kwargs)
+		lineage_path = settings.pop('lineage_path')
+		epoch = cls(header['initial_size'], header['target_iterations'], **settings)
+		if lineage_path is not None:
+			#the run's own store, kept as it is; records newer than the checkpoint are dropped as the run carries on
+			epoch.lineage_path = lineage_path
+			epoch.lineage = LineageStore(lineage_path)
+
+		Organism.organism_counter = header['organism_counter']
+		Organism.predator_counter = header['predator_counter']
+		Organism.prey_counter = header['prey_counter']
+		Generation.generation_counter = header['generation_id']
+		epoch.current = Generation(population=population, lineage=epoch.lineage)
+		epoch.generations = [epoch.current]
+		epoch.generation_count = header['generation_count']
+		epoch.summaries = header['summaries']
+
+		version, internal_state, gauss_next = header['random_state']
+		random.setstate((version, tuple(internal_state), gauss_next))
+		return epoch
+
+	def generation_seed(self):
+		#duel seed for the next generation. None (no seed, one worker) leaves the duels on the random module as before
+		if self.seed is None and self.workers == 1:
+			return None
+		return random.getrandbits(64)
+
+	def __repr__(self):
+		return "Epoch {}".format(self.id)
+
+
+class Archipelago(object):
+	"""
+	An island-model run: islands sub-populations of island_size organisms, each evolving in a process of its own the 
+	way an Epoch does (simulate_generation, then reproduce) for target_iterations generations. Every migration_interval
+	generations the islands stop between generations and each sends a random migration_fraction of its newborns to the
+	next island round the ring, as Population.pack_rows records over queues.
+
+	An island that collapses doesn't end the run: it sits idle until migrants give it both sides again. Its neighbour
+	sends it reseed_fraction of its newborns instead of migration_fraction.
+
+	Each island's generation summaries go to sink as report_ready events, tagged with an 'island' number, after each 
+	stretch between migrations, and are kept in self.summaries[island]. Organism and generation ids are unique across
+	the islands: island i numbers both from i * self.id_stride up. The stride is id_stride, or less where the id column's C long is
+	only 32 bits (Windows, 32-bit builds): there the islands share 2**31 ids between them, and an island that runs 
+	through its share fails with an OverflowError rather than reuse its neighbour's ids. With seed set, the run is 
+	reproducible.
+	"""
+
+	#ids per island, where the id column has room for them
+	id_stride = 10 ** 12
+
+	def __init__(self, islands, island_size, target_iterations, **kwargs):
+		self.islands = islands
+		self.island_size = island_size
+		self.target_iterations = target_iterations
+		self.migration_interval = kwargs.get('migration_interval', 5)
+		self.migration_fraction = kwargs.get('migration_fraction', 0.05)
+		self.reseed_fraction = kwargs.get('reseed_fraction', 0.25)
+		#'python', 'numpy' or 'world'; see Generation.simulate_generation
+		self.engine = kwargs.get('engine', 'python')
+		if self.engine == 'numpy' and numpy is None:
+			raise ImportError("The vectorized combat engine requires numpy")
+		self.seed = kwargs.get('seed', None)
+		#the largest id Population.typecode holds, shared out between the islands
+		largest_id = 2 ** (8 * array.array(Population.typecode).itemsize - 1) - 1
+		self.id_stride = min(Archipelago.id_stride, largest_id // islands)
+		#offspring per side per island; see Generation.reproduce
+		self.capacity = kwargs.get('capacity', None)
+		self.sink = kwargs.get('sink', None) or ConsoleSink()
+
+		self.summaries = [[] for i in range(0, islands)]
+		#whether each island is collapsed, as of the last migration (or the end of the run)
+		self.collapsed = [False] * islands
+		#organisms each island has received, all told
+		self.immigrant_counts = [0] * islands
+		self.simulation_has_run = False
+
+	def simulate(self):
+		if self.seed is not None:
+			rng = random.Random(self.seed)
+			seeds = [rng.getrandbits(64) for i in range(0, self.islands)]
+		else:
+			seeds = [None] * self.islands
+		inboxes = [multiprocessing.Queue() for i in range(0, self.islands)]
+		outbox = multiprocessing.Queue()
+		processes = [multiprocessing.Process(target=_island_worker,
+			args=(i, self.island_size, seeds[i], self.engine, self.capacity, self.id_stride, inboxes[i], outbox))
+			for i in range(0, self.islands)]
+		for process in processes:
+			process.daemon = True
+			process.start()
+
+		try:
+			done = 0
+			immigrants = [None] * self.islands
+			while done < self.target_iterations:
+				stretch = min(self.migration_interval, self.target_iterations - done)
+				done += stretch
+				final = done >= self.target_iterations
+				for i in range(0, self.islands):
+					inboxes[i].put(('run', stretch, final, immigrants[i]))
+				results = self.collect(outbox)
+				for i in range(0, self.islands):
+					summaries, self.collapsed[i] = results[i]
+					for summary in summaries:
+						summary['island'] = i
+						self.summaries[i].append(summary)
+						self.sink.report_ready(summary)
+				if final:
+					break
+
+				#island i sends to island i + 1, a bigger share if that one has collapsed
+				for i in range(0, self.islands):
+					receiver = (i + 1) % self.islands
+					fraction = self.reseed_fraction if self.collapsed[receiver] else self.migration_fraction
+					inboxes[i].put(('emigrate', fraction))
+				migrants = self.collect(outbox)
+				immigrants = [migrants[(i - 1) % self.islands] for i in range(0, self.islands)]
+				for i in range(0, self.islands):
+					self.immigrant_counts[i] += len(immigrants[i]['predator'])
+
+			for inbox in inboxes:
+				inbox.put(('stop',))
+			for process in processes:
+				process.join()
+		finally:
+			for process in processes:
+				if process.is_alive():
+					process.terminate()
 
-		print "Simulating G{}; FINAL ITERATION".format(gen.id)
-		print "Initial: {} (Py: {}) (Pd: {}) (Nv: {})".format(gen.initial_total_count, gen.initial_prey_count, gen.initial_predator_count, gen.nonviable_prey_count+gen.nonviable_predator_count)
-		gen = gen.simulate_generation()
-		print "-----------------------\n\r\n\r"
-		print "{} generations simulated".format(self.target_iterations)
 		self.simulation_has_run = True
-		print "G0 vs G{}".format(self.target_iterations)
-		print "-----------------------\n\r\n\r"
-		self.generations[0].simulation_report()
-		self.generations[-1].simulation_report()
 		return self
 
+	def collect(self, outbox):
+		#one reply from every island, as a list in island order; an island's exception is raised here
+		replies = [None] * self.islands
+		for n in range(0, self.islands):
+			island, failed, reply = outbox.get()
+			if failed:
+				raise RuntimeError("Island {} failed:\n{}".format(island, reply))
+			replies[island] = reply
+		return replies
+
 	def __repr__(self):
-		return "Epoch {}".format(self.id)
+		return "Archipelago of {} islands".format(self.islands)
+
+
+def _island_worker(island, size, seed, engine, capacity, id_stride, inbox, outbox):
+	"""
+	Process entry point for one Archipelago island. Commands come in on inbox: ('run', generations, final, immigrants)
+	admits the immigrants, if any, into the waiting generation and simulates up to generations generations (stopping 
+	early on a collapse), replying with their summaries and whether the island is collapsed; ('emigrate', fraction)
+	replies with the emigrants' record; ('stop',) ends it. Replies go on outbox as (island, failed, reply).
+	"""
+	try:
+		#the dice were copied from the parent process; every island needs its own
+		random.seed(seed)
+		dice.seed(random.getrandbits(64))
+		#so are the id counters: organisms and generations are both numbered from the island's own range
+		Organism.organism_counter = island * id_stride
+		Generation.generation_counter = island * id_stride
+		gen = Generation(n=size)
+		while True:
+			message = inbox.get()
+			if message[0] == 'stop':
+				return
+			if message[0] == 'emigrate':
+				outbox.put((island, False, gen.emigrate(message[1])))
+				continue
+
+			command, generations, final, immigrants = message
+			if immigrants is not None:
+				gen.admit(immigrants)
+			summaries = []
+			for n in range(0, generations):
+				if gen.collapsed():
+					break
+				gen.simulate_generation(engine=engine, seed=random.getrandbits(64), sink=NullSink())
+				summaries.append(gen.summary())
+				if final and n == generations - 1:
+					break
+				gen = gen.reproduce(capacity=capacity)
+				if Organism.organism_counter > (island + 1) * id_stride:
+					raise OverflowError("Island {} has used up its {} organism ids".format(island, id_stride))
+			outbox.put((island, False, (summaries, gen.collapsed())))
+	except Exception:
+		outbox.put((island, True, traceback.format_exc()))
+
+
+def _align(nbytes):
+	#rounds up to a multiple of 8 bytes
+	return (nbytes + 7) // 8 * 8
+
+def _column_layout(population):
+	#[name, offset, nbytes] for every column of population as _write_columns lays them out, each on an 8-byte boundary
+	columns = []
+	offset = 0
+	for name in ('id',) + Population.stat_columns + Population.flag_columns:
+		column = getattr(population, name)
+		nbytes = len(column) * (column.itemsize if isinstance(column, array.array) else 1)
+		columns.append([name, offset, nbytes])
+		offset += _align(nbytes)
+	return columns
+
+def _write_columns(f, population, columns):
+	#writes population's columns to f raw, as laid out by _column_layout
+	for name, offset, nbytes in columns:
+		column = getattr(population, name)
+		if isinstance(column, array.array):
+			column.tofile(f)
+		else:
+			f.write(column)
+		f.write(b'\0' * (_align(nbytes) - nbytes))
+
+def _read_columns(f, data_start, header):
+	#rebuilds a Population from columns written by _write_columns starting at data_start in file f; header gives their
+	#layout ('columns') and how they were written ('typecode', 'itemsize' and 'byteorder'). Each column is read
+	#straight from the file into its array, with no buffer in between
+	population = Population()
+	for name, offset, nbytes in header['columns']:
+		name = str(name)
+		f.seek(data_start + offset)
+		if name in Population.flag_columns:
+			column = bytearray(nbytes)
+			if f.readinto(column) != nbytes:
+				raise EOFError("The {} column is cut short".format(name))
+			setattr(population, name, column)
+			continue
+		column = array.array(str(header['typecode']))
+		if column.itemsize != header['itemsize']:
+			raise ValueError("Saved stats are {}-byte integers; here they are {}".format(header['itemsize'], column.itemsize))
+		column.fromfile(f, nbytes // column.itemsize)
+		if header['byteorder'] != sys.byteorder:
+			column.byteswap()
+		setattr(population, name, column)
+	population.index = dict((organism_id, slot) for slot, organism_id in enumerate(population.id))
+	return population
 
 
 